@@ -1,11 +1,23 @@
-import fitz  # PyMuPDF
+import base64
 import os
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import filedialog, messagebox
-from datetime import datetime
-import threading
-import time
-import math
+
+import pdf_encoding
+import pdf_engine
+import pdf_estimate
+import pdf_journal
+import pdf_preview
+import pdf_queue
+import pdf_writer
+from pdf_progress import format_eta
+
+# Drag and drop needs the optional tkinterdnd2 package
+try:
+    from tkinterdnd2 import DND_FILES, TkinterDnD
+except ImportError:
+    TkinterDnD = None
 
 class PDFResizerApp:
     def __init__(self):
@@ -20,14 +32,28 @@ class PDFResizerApp:
         ctk.set_default_color_theme("dark-blue")
         
         # Variables
-        self.input_file = ""
-        self.output_file = ""
+        self.input_files = []
+        self.output_overrides = {}
+        self.job_queue = None
+        self.job_rows = {}
         self.is_processing = False
         self.is_fullscreen = False
+        self.estimate_generation = 0
+        self.estimate_after_id = None
+        self.preview_page = 0
+        self.preview_page_count = None
+        self.preview_request = None
+        self.preview_after_id = None
+        self.preview_images = []
+        self.preview_renderer = pdf_preview.PreviewRenderer(
+            lambda request, preview, error: self.window.after(0, lambda: self.on_preview_ready(request, preview, error))
+        )
         
         # Configure window
         self.window.bind("<F11>", self.toggle_fullscreen)
         self.window.bind("<Escape>", self.exit_fullscreen)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.drag_and_drop = self.enable_drag_and_drop()
         
         # Create main container
         self.main_container = ctk.CTkFrame(self.window, corner_radius=20, fg_color="#2b2b2b")
@@ -35,6 +61,23 @@ class PDFResizerApp:
         
         self.show_main_ui()
     
+    def enable_drag_and_drop(self):
+        """Load tkdnd into the window if tkinterdnd2 is installed; returns whether it worked"""
+        if TkinterDnD is None:
+            return False
+        try:
+            TkinterDnD._require(self.window)
+        except Exception:
+            return False
+        return True
+    
+    def on_close(self):
+        """Cancel running jobs so their processes exit with the window"""
+        if self.job_queue is not None:
+            self.job_queue.shutdown(cancel=True, wait=False)
+        self.preview_renderer.close()
+        self.window.destroy()
+    
     def toggle_fullscreen(self, event=None):
         """Toggle fullscreen mode"""
         self.is_fullscreen = not self.is_fullscreen
@@ -78,30 +121,55 @@ class PDFResizerApp:
         
         ctk.CTkLabel(
             file_card, 
-            text="📁 Select PDF File", 
+            text="📁 Select PDF Files", 
             font=ctk.CTkFont(size=16, weight="bold")
         ).pack(pady=(15, 5))
         
         self.file_label = ctk.CTkLabel(
             file_card, 
-            text="No file selected", 
+            text=self.describe_selection(), 
             text_color="#888888",
             wraplength=400,
             font=ctk.CTkFont(size=11)
         )
         self.file_label.pack(pady=5)
         
+        select_row = ctk.CTkFrame(file_card, fg_color="transparent")
+        select_row.pack(pady=(5, 15), padx=20)
+        
         self.select_btn = ctk.CTkButton(
-            file_card,
+            select_row,
             text="Browse Files",
-            command=self.select_file,
+            command=self.select_files,
             corner_radius=10,
             height=35,
             font=ctk.CTkFont(size=12, weight="bold"),
             fg_color="#4CAF50",
             hover_color="#45a049"
         )
-        self.select_btn.pack(pady=(5, 15), padx=20)
+        self.select_btn.pack(side="left", padx=5)
+        
+        self.folder_btn = ctk.CTkButton(
+            select_row,
+            text="Add Folder",
+            command=self.select_folder,
+            corner_radius=10,
+            height=35,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#4CAF50",
+            hover_color="#45a049"
+        )
+        self.folder_btn.pack(side="left", padx=5)
+        
+        if self.drag_and_drop:
+            ctk.CTkLabel(
+                file_card,
+                text="or drop PDF files and folders here",
+                text_color="#666666",
+                font=ctk.CTkFont(size=9)
+            ).pack(pady=(0, 10))
+            file_card.drop_target_register(DND_FILES)
+            file_card.dnd_bind("<<Drop>>", self.on_drop)
         
         # Settings card
         settings_card = ctk.CTkFrame(self.main_container, corner_radius=15, fg_color="#3a3a3a")
@@ -139,6 +207,29 @@ class PDFResizerApp:
         self.scale_slider.set(90)
         self.scale_slider.pack(fill="x", pady=5)
         
+        # Live preview of the page in view
+        preview_frame = ctk.CTkFrame(settings_card, fg_color="#2b2b2b", corner_radius=10)
+        preview_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(preview_frame, text="👁️ Preview (whole page / 1:1 detail at DPI):", font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=10, pady=(8, 0))
+        
+        images_row = ctk.CTkFrame(preview_frame, fg_color="transparent")
+        images_row.pack(pady=5)
+        box_width, box_height = pdf_preview.DEFAULT_BOX
+        self.preview_label = ctk.CTkLabel(images_row, text="", width=box_width, height=box_height, fg_color="#1f1f1f")
+        self.preview_label.pack(side="left", padx=5)
+        self.detail_label = ctk.CTkLabel(images_row, text="", width=box_width, height=box_height, fg_color="#1f1f1f")
+        self.detail_label.pack(side="left", padx=5)
+        
+        nav_row = ctk.CTkFrame(preview_frame, fg_color="transparent")
+        nav_row.pack(pady=(0, 8))
+        ctk.CTkButton(nav_row, text="◀", width=32, command=lambda: self.change_preview_page(-1),
+                      fg_color="#FF6B35", hover_color="#E55A2B").pack(side="left")
+        self.preview_page_label = ctk.CTkLabel(nav_row, text="", width=140, font=ctk.CTkFont(size=11))
+        self.preview_page_label.pack(side="left", padx=8)
+        ctk.CTkButton(nav_row, text="▶", width=32, command=lambda: self.change_preview_page(1),
+                      fg_color="#FF6B35", hover_color="#E55A2B").pack(side="left")
+        
         # DPI setting
         dpi_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
         dpi_frame.pack(pady=8, padx=20, fill="x")
@@ -159,6 +250,100 @@ class PDFResizerApp:
         self.dpi_combo.set("300")
         self.dpi_combo.pack(fill="x", pady=8)
         
+        # Render mode setting
+        mode_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
+        mode_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(mode_frame, text="🖨️ Render Mode:", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        self.mode_var = ctk.StringVar(value=pdf_engine.DEFAULT_RENDER_MODE)
+        self.mode_combo = ctk.CTkComboBox(
+            mode_frame,
+            values=pdf_engine.RENDER_MODES,
+            variable=self.mode_var,
+            state="readonly",
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.mode_combo.set(pdf_engine.DEFAULT_RENDER_MODE)
+        self.mode_combo.pack(fill="x", pady=8)
+        
+        # Image encoding setting
+        encoding_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
+        encoding_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(encoding_frame, text="🎨 Image Encoding (format / colors / quality):", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        encoding_row = ctk.CTkFrame(encoding_frame, fg_color="transparent")
+        encoding_row.pack(fill="x", pady=8)
+        
+        default_encoding = pdf_encoding.DEFAULT_ENCODING
+        self.format_var = ctk.StringVar(value=default_encoding.image_format)
+        self.format_combo = ctk.CTkComboBox(
+            encoding_row,
+            values=pdf_encoding.IMAGE_FORMATS,
+            variable=self.format_var,
+            state="readonly",
+            width=110,
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.format_combo.set(default_encoding.image_format)
+        self.format_combo.pack(side="left", padx=(0, 8))
+        
+        self.colorspace_var = ctk.StringVar(value=default_encoding.colorspace)
+        self.colorspace_combo = ctk.CTkComboBox(
+            encoding_row,
+            values=pdf_encoding.COLORSPACES,
+            variable=self.colorspace_var,
+            state="readonly",
+            width=110,
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.colorspace_combo.set(default_encoding.colorspace)
+        self.colorspace_combo.pack(side="left", padx=(0, 8))
+        
+        self.quality_var = ctk.StringVar(value=str(default_encoding.quality))
+        self.quality_entry = ctk.CTkEntry(
+            encoding_row,
+            textvariable=self.quality_var,
+            placeholder_text="Quality 1-100",
+            justify="center"
+        )
+        self.quality_entry.pack(side="left", fill="x", expand=True)
+        
+        self.drop_blank_var = ctk.BooleanVar(value=False)
+        self.drop_blank_check = ctk.CTkCheckBox(
+            encoding_frame,
+            text="🗑️ Drop blank pages (colors: auto)",
+            variable=self.drop_blank_var,
+            fg_color="#FF6B35",
+            hover_color="#E55A2B"
+        )
+        self.drop_blank_check.pack(anchor="w")
+        
+        # Target output size setting
+        target_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
+        target_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(target_frame, text="🎯 Target Output MB (0 = off, DPI/quality become maximums):", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        self.target_mb_var = ctk.StringVar(value="0")
+        self.target_mb_entry = ctk.CTkEntry(
+            target_frame,
+            textvariable=self.target_mb_var,
+            placeholder_text="Enter target output size in MB",
+            justify="center"
+        )
+        self.target_mb_entry.pack(fill="x", pady=8)
+        
         # Split PDF setting
         split_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
         split_frame.pack(pady=8, padx=20, fill="x")
@@ -174,6 +359,97 @@ class PDFResizerApp:
         )
         self.split_entry.pack(fill="x", pady=8)
         
+        ctk.CTkLabel(split_frame, text="📦 Max MB per File (0 = no limit):", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        self.split_mb_var = ctk.StringVar(value="0")
+        self.split_mb_entry = ctk.CTkEntry(
+            split_frame,
+            textvariable=self.split_mb_var,
+            placeholder_text="Enter max size per file in MB",
+            justify="center"
+        )
+        self.split_mb_entry.pack(fill="x", pady=8)
+        
+        # Save profile setting
+        save_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
+        save_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(save_frame, text="💾 Save Profile (fast = quickest, small = smallest):", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        self.save_profile_var = ctk.StringVar(value=pdf_writer.DEFAULT_SAVE_PROFILE)
+        self.save_profile_combo = ctk.CTkComboBox(
+            save_frame,
+            values=pdf_writer.SAVE_PROFILES,
+            variable=self.save_profile_var,
+            state="readonly",
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.save_profile_combo.set(pdf_writer.DEFAULT_SAVE_PROFILE)
+        self.save_profile_combo.pack(fill="x", pady=8)
+        
+        # Worker processes setting
+        workers_frame = ctk.CTkFrame(settings_card, fg_color="transparent")
+        workers_frame.pack(pady=8, padx=20, fill="x")
+        
+        ctk.CTkLabel(workers_frame, text="🧵 Worker Processes:", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        cpu_count = os.cpu_count() or 1
+        self.workers_var = ctk.StringVar(value=str(pdf_engine.DEFAULT_WORKERS))
+        self.workers_combo = ctk.CTkComboBox(
+            workers_frame,
+            values=[str(n) for n in range(1, cpu_count + 1)],
+            variable=self.workers_var,
+            state="readonly",
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.workers_combo.set(str(pdf_engine.DEFAULT_WORKERS))
+        self.workers_combo.pack(fill="x", pady=8)
+        
+        ctk.CTkLabel(workers_frame, text="📚 Files at Once:", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        
+        self.jobs_var = ctk.StringVar(value=str(pdf_queue.DEFAULT_CONCURRENCY))
+        self.jobs_combo = ctk.CTkComboBox(
+            workers_frame,
+            values=[str(n) for n in range(1, cpu_count + 1)],
+            variable=self.jobs_var,
+            state="readonly",
+            dropdown_fg_color="#3a3a3a",
+            dropdown_hover_color="#4a4a4a",
+            button_color="#FF6B35",
+            button_hover_color="#E55A2B"
+        )
+        self.jobs_combo.set(str(pdf_queue.DEFAULT_CONCURRENCY))
+        self.jobs_combo.pack(fill="x", pady=8)
+        
+        # Pre-run estimate
+        self.estimate_label = ctk.CTkLabel(
+            settings_card,
+            text="📊 Select a file to see an estimate",
+            text_color="#888888",
+            wraplength=400,
+            font=ctk.CTkFont(size=11)
+        )
+        self.estimate_label.pack(pady=(5, 15), padx=20)
+        
+        # Refresh the estimate whenever a setting changes
+        for var in (self.scale_var, self.dpi_var, self.mode_var, self.format_var, self.colorspace_var,
+                    self.quality_var, self.split_var, self.split_mb_var, self.workers_var):
+            var.trace_add("write", self.schedule_estimate)
+        
+        # Refresh the preview whenever a setting that changes the picture changes
+        for var in (self.scale_var, self.dpi_var, self.mode_var, self.format_var, self.colorspace_var,
+                    self.quality_var):
+            var.trace_add("write", self.schedule_preview)
+        if self.input_files:
+            self.schedule_estimate()
+        self.schedule_preview()
+        
         # Start button section
         button_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
         button_frame.pack(pady=20, fill="x")
@@ -209,8 +485,8 @@ class PDFResizerApp:
         )
         fullscreen_label.pack(pady=(0, 10))
     
-    def show_processing_ui(self):
-        """Show processing UI with progress bar"""
+    def show_processing_ui(self, jobs):
+        """Show processing UI with overall progress and one row per queued job"""
         # Clear container
         for widget in self.main_container.winfo_children():
             widget.destroy()
@@ -221,7 +497,7 @@ class PDFResizerApp:
         
         ctk.CTkLabel(
             header_frame, 
-            text="⏳ Processing PDF...", 
+            text=f"⏳ Processing {len(jobs)} PDF{'s' if len(jobs) != 1 else ''}...", 
             font=ctk.CTkFont(size=24, weight="bold", family="Arial")
         ).pack()
         
@@ -271,16 +547,48 @@ class PDFResizerApp:
         # Status message
         self.processing_status = ctk.CTkLabel(
             progress_card, 
-            text="🔄 Starting processing...", 
+            text=f"📚 Files: 0/{len(jobs)} done", 
             text_color="#FFD700",
             font=ctk.CTkFont(size=12, weight="bold")
         )
         self.processing_status.pack(pady=10)
         
+        # One row per job
+        jobs_frame = ctk.CTkScrollableFrame(progress_card, fg_color="#2b2b2b", corner_radius=10, height=180)
+        jobs_frame.pack(pady=5, padx=20, fill="both", expand=True)
+        
+        self.job_rows = {}
+        for job in jobs:
+            row = ctk.CTkFrame(jobs_frame, fg_color="transparent")
+            row.pack(fill="x", pady=4)
+            
+            cancel_job_btn = ctk.CTkButton(
+                row,
+                text="✖",
+                width=28,
+                height=28,
+                command=job.cancel,
+                fg_color="#DC143C",
+                hover_color="#B22222"
+            )
+            cancel_job_btn.pack(side="right", padx=(8, 0))
+            
+            name_label = ctk.CTkLabel(row, text=os.path.basename(job.input_path), anchor="w", font=ctk.CTkFont(size=11, weight="bold"))
+            name_label.pack(fill="x")
+            
+            job_bar = ctk.CTkProgressBar(row, mode="determinate", height=8, progress_color="#FF6B35")
+            job_bar.pack(fill="x", pady=2)
+            job_bar.set(0)
+            
+            job_status = ctk.CTkLabel(row, text="⏸️ Queued", anchor="w", text_color="#888888", font=ctk.CTkFont(size=10))
+            job_status.pack(fill="x")
+            
+            self.job_rows[job.id] = (job_bar, job_status, cancel_job_btn)
+        
         # Cancel button
         self.cancel_btn = ctk.CTkButton(
             progress_card,
-            text="❌ Cancel Processing",
+            text="❌ Cancel All",
             command=self.cancel_processing,
             corner_radius=10,
             height=35,
@@ -294,28 +602,220 @@ class PDFResizerApp:
     def update_scale_label(self, value):
         self.scale_var.set(f"{int(value)}%")
     
-    def select_file(self):
+    def describe_selection(self):
+        if not self.input_files:
+            return "No file selected"
+        if len(self.input_files) == 1:
+            return os.path.basename(self.input_files[0])
+        names = ", ".join(os.path.basename(path) for path in self.input_files[:3])
+        more = f" and {len(self.input_files) - 3} more" if len(self.input_files) > 3 else ""
+        return f"{len(self.input_files)} files: {names}{more}"
+    
+    def select_files(self):
         if self.is_processing:
             return
             
-        file_path = filedialog.askopenfilename(
-            title="Select PDF File",
+        file_paths = filedialog.askopenfilenames(
+            title="Select PDF Files",
             filetypes=[("PDF Files", "*.pdf"), ("All Files", "*.*")]
         )
         
-        if file_path:
-            self.input_file = file_path
-            filename = os.path.basename(file_path)
-            self.file_label.configure(text=filename)
-            
-            # Generate output filename automatically
-            base_name = os.path.splitext(filename)[0]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.output_file = f"{base_name}_resized_{timestamp}.pdf"
-            self.status_label.configure(text="✅ File selected - Ready to process", text_color="#4CAF50")
+        if file_paths:
+            self.set_input_files(list(file_paths))
+    
+    def select_folder(self):
+        if self.is_processing:
+            return
+        
+        folder = filedialog.askdirectory(title="Select Folder with PDF Files")
+        if folder:
+            self.set_input_files([folder])
+    
+    def on_drop(self, event):
+        """Handle files and folders dropped on the file card"""
+        if not self.is_processing:
+            self.set_input_files(list(self.window.tk.splitlist(event.data)))
+    
+    def set_input_files(self, paths):
+        """Expand files and folders into the list of PDFs to process"""
+        files = pdf_queue.collect_input_files(paths)
+        if not files:
+            self.status_label.configure(text="❌ No PDF files found", text_color="#DC143C")
+            return
+        
+        self.input_files = files
+        self.output_overrides = {}
+        self.file_label.configure(text=self.describe_selection())
+        self.status_label.configure(
+            text=f"✅ {len(files)} file{'s' if len(files) != 1 else ''} selected - Ready to process",
+            text_color="#4CAF50"
+        )
+        if len(files) == 1:
+            self.offer_resume(files[0])
+        self.preview_page = 0
+        self.preview_page_count = None
+        self.schedule_estimate()
+        self.schedule_preview()
+    
+    def output_dir_for(self, file_path):
+        """Outputs, and the journals offer_resume looks for, go next to their input"""
+        return os.path.dirname(os.path.abspath(file_path))
+    
+    def offer_resume(self, file_path):
+        """Offer to continue an interrupted split job on this file"""
+        unfinished = pdf_journal.find_resumable_jobs(file_path, self.output_dir_for(file_path))
+        if not unfinished:
+            return
+        job = unfinished[-1]
+        pages_done = job["parts"][-1]["last_page"] + 1 if job["parts"] else 0
+        if not messagebox.askyesno(
+            "Resume",
+            f"An unfinished job on this file was found ({len(job['parts'])} parts, {pages_done} pages done).\n\n"
+            f"Resume it with the same settings?"
+        ):
+            return
+        self.output_overrides[file_path] = job["output"]
+        self.apply_settings(job["settings"])
+        self.status_label.configure(text="⏯️ Unfinished job found - it will resume", text_color="#4CAF50")
+    
+    def apply_settings(self, settings):
+        """Load saved job settings into the settings card"""
+        scale = int(round(settings["scale_factor"] * 100))
+        self.scale_slider.set(scale)
+        self.update_scale_label(scale)
+        self.dpi_combo.set(str(settings["dpi"]))
+        self.mode_combo.set(settings["render_mode"])
+        self.format_combo.set(settings["encoding"]["image_format"])
+        self.colorspace_combo.set(settings["encoding"]["colorspace"])
+        self.quality_var.set(str(settings["encoding"]["quality"]))
+        self.split_var.set(str(settings["max_pages_per_file"]))
+        self.split_mb_var.set(f"{settings['max_bytes_per_file'] / 1024 / 1024:g}")
+        self.drop_blank_var.set(settings.get("drop_blank_pages", False))
+        self.save_profile_combo.set(settings.get("save_profile", pdf_writer.DEFAULT_SAVE_PROFILE))
+    
+    def schedule_estimate(self, *args):
+        """Re-estimate shortly after the last settings change"""
+        if not self.input_files or self.is_processing:
+            return
+        if self.estimate_after_id is not None:
+            self.window.after_cancel(self.estimate_after_id)
+        self.estimate_after_id = self.window.after(400, self.start_estimate)
+    
+    def start_estimate(self):
+        """Estimate time, size and parts for the current settings on the background render thread"""
+        self.estimate_after_id = None
+        if not self.input_files or self.is_processing:
+            return
+        try:
+            scale_factor = int(self.scale_var.get().replace('%', '')) / 100
+            dpi = int(self.dpi_var.get())
+            max_pages = int(self.split_var.get())
+            max_mb = float(self.split_mb_var.get())
+            quality = int(self.quality_var.get())
+        except ValueError:
+            self.estimate_label.configure(text="📊 Enter valid settings to see an estimate", text_color="#888888")
+            return
+        options = {
+            "render_mode": self.mode_var.get(),
+            "encoding": pdf_encoding.ImageEncoding(self.format_var.get(), quality, self.colorspace_var.get()),
+            "max_bytes_per_file": int(max(0, max_mb) * 1024 * 1024),
+            "workers": int(self.workers_var.get()),
+        }
+        
+        self.estimate_generation += 1
+        self.estimate_label.configure(text="📊 Estimating...", text_color="#888888")
+        # Shares the preview's thread: PyMuPDF is not safe to use from two threads at once
+        generation, input_path = self.estimate_generation, self.input_files[0]
+        self.preview_renderer.call(
+            lambda: self.run_estimate(generation, input_path, scale_factor, dpi, max(0, max_pages), options)
+        )
+    
+    def run_estimate(self, generation, input_path, scale_factor, dpi, max_pages_per_file, options):
+        """Run the sampling estimator off the UI thread"""
+        try:
+            estimate = pdf_estimate.estimate_job(input_path, scale_factor, dpi, max_pages_per_file, **options)
+            text = (
+                f"📊 Estimate: ~{estimate.output_bytes / 1024 / 1024:.1f} MB in {estimate.parts} "
+                f"file{'s' if estimate.parts != 1 else ''}, about {format_eta(estimate.seconds)} "
+                f"for {estimate.pages} pages"
+            )
+            if len(self.input_files) > 1:
+                text += f" (first of {len(self.input_files)} files)"
+        except Exception as e:
+            text = f"📊 Estimate unavailable: {e}"
+        self.window.after(0, lambda: self.on_estimate_ready(generation, text))
+    
+    def on_estimate_ready(self, generation, text):
+        """Show an estimate unless settings changed or the settings card is gone"""
+        if generation != self.estimate_generation or self.is_processing:
+            return
+        if self.estimate_label.winfo_exists():
+            self.estimate_label.configure(text=text, text_color="#CCCCCC")
+    
+    def change_preview_page(self, step):
+        if not self.input_files:
+            return
+        page = self.preview_page + step
+        if page < 0 or (self.preview_page_count is not None and page >= self.preview_page_count):
+            return
+        self.preview_page = page
+        self.schedule_preview()
+    
+    def schedule_preview(self, *args):
+        """Show the preview for the current settings, rendering it shortly after the last change"""
+        if self.preview_after_id is not None:
+            self.window.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+        if self.is_processing or not self.preview_label.winfo_exists():
+            return
+        if not self.input_files:
+            self.preview_page_label.configure(text="No file selected")
+            return
+        try:
+            request = pdf_preview.make_request(
+                self.input_files[0],
+                self.preview_page,
+                int(self.scale_var.get().replace('%', '')) / 100,
+                int(self.dpi_var.get()),
+                self.mode_var.get(),
+                pdf_encoding.ImageEncoding(self.format_var.get(), int(self.quality_var.get()), self.colorspace_var.get())
+            )
+        except ValueError:
+            return
+        self.preview_request = request
+        
+        # Settings seen before come straight from the cache, so the slider never waits
+        cached = self.preview_renderer.cached(request)
+        if cached is not None:
+            self.show_preview(cached)
+        else:
+            self.preview_page_label.configure(text=f"Page {self.preview_page + 1} • rendering...")
+            self.preview_after_id = self.window.after(150, lambda: self.preview_renderer.request(request))
+    
+    def on_preview_ready(self, request, preview, error):
+        """Show a finished preview unless the settings or page moved on"""
+        if request != self.preview_request or self.is_processing or not self.preview_label.winfo_exists():
+            return
+        if error is not None:
+            self.preview_page_label.configure(text=f"Preview unavailable: {error}")
+            return
+        self.show_preview(preview)
+    
+    def show_preview(self, preview):
+        # PhotoImage reads PNG natively, so previews need no imaging library
+        images = [
+            tk.PhotoImage(data=base64.b64encode(png)) if png is not None else None
+            for png in (preview.thumbnail, preview.detail)
+        ]
+        self.preview_label.configure(image=images[0])
+        self.detail_label.configure(image=images[1] or "", text="" if images[1] else "Vector mode:\nno raster detail")
+        # Tk only keeps a weak reference to images
+        self.preview_images = images
+        self.preview_page_count = preview.page_count
+        self.preview_page_label.configure(text=f"Page {self.preview_page + 1} / {preview.page_count}")
     
     def start_processing(self):
-        if not self.input_file:
+        if not self.input_files:
             messagebox.showerror("Error", "Please select a PDF file first!")
             return
         
@@ -332,200 +832,171 @@ class PDFResizerApp:
             messagebox.showerror("Error", "Please enter a valid number for max pages per file!")
             return
         
+        # Validate split size
+        try:
+            max_mb = float(self.split_mb_var.get())
+            if max_mb < 0:
+                messagebox.showerror("Error", "Max MB per file must be a positive number or 0!")
+                return
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number for max MB per file!")
+            return
+        
+        # Validate image quality
+        try:
+            quality = int(self.quality_var.get())
+            if not 1 <= quality <= 100:
+                messagebox.showerror("Error", "Image quality must be between 1 and 100!")
+                return
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number for image quality!")
+            return
+        
+        # Validate target size
+        try:
+            target_mb = float(self.target_mb_var.get())
+            if target_mb < 0:
+                messagebox.showerror("Error", "Target output MB must be a positive number or 0!")
+                return
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number for target output MB!")
+            return
+        if target_mb and self.mode_var.get() != "raster":
+            messagebox.showerror("Error", "Target output size only applies to raster mode!")
+            return
+        if self.drop_blank_var.get() and (self.mode_var.get() != "raster" or self.colorspace_var.get() != "auto"):
+            messagebox.showerror("Error", "Dropping blank pages needs raster mode with colors set to auto!")
+            return
+        
         # Switch to processing UI
-        self.show_processing_ui()
+        if self.estimate_after_id is not None:
+            self.window.after_cancel(self.estimate_after_id)
+            self.estimate_after_id = None
         self.is_processing = True
         
         # Get settings values
         scale_factor = int(self.scale_var.get().replace('%', '')) / 100
         dpi = int(self.dpi_var.get())
-        
-        # Start processing in separate thread
-        self.processing_thread = threading.Thread(
-            target=self.process_pdf_thread,
-            args=(self.input_file, self.output_file, scale_factor, dpi, max_pages),
-            daemon=True
-        )
-        self.processing_thread.start()
+        options = {
+            "workers": int(self.workers_var.get()),
+            "render_mode": self.mode_var.get(),
+            "encoding": pdf_encoding.ImageEncoding(self.format_var.get(), quality, self.colorspace_var.get()),
+            "max_bytes_per_file": int(max_mb * 1024 * 1024),
+            "drop_blank_pages": self.drop_blank_var.get(),
+            "save_profile": self.save_profile_var.get(),
+            # Only takes effect if the journal matches these exact settings
+            "resume": True,
+        }
+        
+        # Each file becomes one job; the queue runs jobs in separate processes
+        self.job_queue = pdf_queue.JobQueue(int(self.jobs_var.get()), on_update=self.on_job_update)
+        jobs = []
+        for input_path in self.input_files:
+            output_path = self.output_overrides.get(input_path) or pdf_engine.make_output_filename(
+                input_path, self.output_dir_for(input_path)
+            )
+            jobs.append(self.job_queue.submit(
+                input_path, output_path, scale_factor, dpi, max_pages,
+                target_bytes=int(target_mb * 1024 * 1024), **options
+            ))
+        self.show_processing_ui(jobs)
     
     def cancel_processing(self):
-        """Cancel the ongoing processing"""
-        if self.is_processing:
-            self.is_processing = False
-            self.show_main_ui()
-            self.status_label.configure(text="⏹️ Processing cancelled", text_color="#FF6B35")
+        """Cancel every queued and running job"""
+        if self.is_processing and self.job_queue is not None:
+            self.job_queue.cancel()
+            self.processing_status.configure(text="⏹️ Cancelling...", text_color="#FF6B35")
     
-    def update_progress(self, current, total, percentage):
-        """Update progress from thread"""
-        self.window.after(0, lambda: self._update_progress_ui(current, total, percentage))
+    def on_job_update(self, job):
+        """Called from queue worker threads whenever a job changes"""
+        self.window.after(0, lambda: self._update_job_ui(job))
     
-    def _update_progress_ui(self, current, total, percentage):
-        """Update UI elements from main thread"""
-        if not self.is_processing:
+    def _update_job_ui(self, job):
+        """Update the job's row and the overall progress from the main thread"""
+        if not self.is_processing or job.id not in self.job_rows:
             return
-            
-        self.progress_bar.set(percentage / 100)
-        self.progress_percent.configure(text=f"{percentage:.1f}%")
-        self.page_counter.configure(text=f"📄 Pages: {current}/{total}")
-        
-        if percentage < 25:
-            self.processing_status.configure(text="🔍 Loading document...", text_color="#FFD700")
-        elif percentage < 50:
-            self.processing_status.configure(text="📝 Processing pages...", text_color="#FFA500")
-        elif percentage < 75:
-            self.processing_status.configure(text="🖼️ Optimizing images...", text_color="#FF6B35")
+        
+        job_bar, job_status, cancel_job_btn = self.job_rows[job.id]
+        if job.status == pdf_queue.QUEUED:
+            job_status.configure(text="⏸️ Queued", text_color="#888888")
+        elif job.status == pdf_queue.RUNNING:
+            if job.progress is None:
+                job_status.configure(text="🔍 Starting...", text_color="#FFD700")
+            else:
+                job_bar.set(job.progress.percentage / 100)
+                job_status.configure(
+                    text=f"📄 {job.pages_done}/{job.total_pages}  •  {job.pages_per_sec:.1f} pages/s  •  "
+                         f"ETA {format_eta(job.progress.eta)}",
+                    text_color="#FFA500"
+                )
         else:
-            self.processing_status.configure(text="✨ Finalizing...", text_color="#4CAF50")
-    
-    def process_pdf_thread(self, input_path, output_path, scale_factor, dpi, max_pages_per_file):
-        """Process PDF in separate thread"""
-        try:
-            success, output_files = self.resize_pdf_for_printing(input_path, output_path, scale_factor, dpi, max_pages_per_file)
-            self.window.after(0, lambda: self.on_processing_complete(success, input_path, output_files))
-            
-        except Exception as e:
-            self.window.after(0, lambda: self.on_processing_error(str(e)))
-    
-    def resize_pdf_for_printing(self, input_pdf_path, output_pdf_path, scale_factor, dpi, max_pages_per_file):
-        """Resize PDF pages with high resolution for quality printing."""
-        try:
-            input_doc = fitz.open(input_pdf_path)
-            total_pages = len(input_doc)
-            zoom = dpi / 72  # Define zoom here to be available in both branches
-            
-            # Determine if we need to split the output
-            split_files = max_pages_per_file > 0 and total_pages > max_pages_per_file
-            
-            if split_files:
-                # Calculate number of output files needed
-                num_files = math.ceil(total_pages / max_pages_per_file)
-                output_files = []
-                
-                for file_index in range(num_files):
-                    # Create a new output document for this chunk
-                    output_doc = fitz.open()
-                    
-                    # Calculate page range for this file
-                    start_page = file_index * max_pages_per_file
-                    end_page = min((file_index + 1) * max_pages_per_file, total_pages)
-                    
-                    # Process each page in this range
-                    for page_num in range(start_page, end_page):
-                        if not self.is_processing:
-                            return False, []
-                            
-                        page = input_doc.load_page(page_num)
-                        original_rect = page.rect
-                        
-                        new_page = output_doc.new_page(width=original_rect.width, height=original_rect.height)
-                        
-                        scaled_width = original_rect.width * scale_factor
-                        scaled_height = original_rect.height * scale_factor
-                        
-                        x_offset = (original_rect.width - scaled_width) / 2
-                        y_offset = (original_rect.height - scaled_height) / 2
-                        
-                        matrix = fitz.Matrix(zoom * scale_factor, zoom * scale_factor)
-                        pix = page.get_pixmap(matrix=matrix)
-                        
-                        target_rect = fitz.Rect(x_offset, y_offset, x_offset + scaled_width, y_offset + scaled_height)
-                        new_page.insert_image(target_rect, pixmap=pix)
-                        
-                        progress_percentage = ((page_num + 1) / total_pages) * 100
-                        self.update_progress(page_num + 1, total_pages, progress_percentage)
-                        
-                        time.sleep(0.02)
-                    
-                    if self.is_processing:
-                        # Generate filename for this chunk
-                        base_name, ext = os.path.splitext(output_pdf_path)
-                        chunk_filename = f"{base_name}_part{file_index + 1}{ext}"
-                        output_doc.save(chunk_filename, deflate=True)
-                        output_files.append(chunk_filename)
-                        output_doc.close()
-                    else:
-                        return False, []
-                
-                input_doc.close()
-                return True, output_files
+            cancel_job_btn.configure(state="disabled")
+            if job.status == pdf_queue.DONE:
+                job_bar.set(1)
+                job_status.configure(
+                    text=f"✅ Done  •  {len(job.output_files)} file{'s' if len(job.output_files) != 1 else ''}",
+                    text_color="#4CAF50"
+                )
+            elif job.status == pdf_queue.CANCELLED:
+                job_status.configure(text="⏹️ Cancelled", text_color="#FF6B35")
             else:
-                # Process as single file (original behavior)
-                output_doc = fitz.open()
-                
-                for page_num in range(total_pages):
-                    if not self.is_processing:
-                        return False, []
-                        
-                    page = input_doc.load_page(page_num)
-                    original_rect = page.rect
-                    
-                    new_page = output_doc.new_page(width=original_rect.width, height=original_rect.height)
-                    
-                    scaled_width = original_rect.width * scale_factor
-                    scaled_height = original_rect.height * scale_factor
-                    
-                    x_offset = (original_rect.width - scaled_width) / 2
-                    y_offset = (original_rect.height - scaled_height) / 2
-                    
-                    matrix = fitz.Matrix(zoom * scale_factor, zoom * scale_factor)
-                    pix = page.get_pixmap(matrix=matrix)
-                    
-                    target_rect = fitz.Rect(x_offset, y_offset, x_offset + scaled_width, y_offset + scaled_height)
-                    new_page.insert_image(target_rect, pixmap=pix)
-                    
-                    progress_percentage = ((page_num + 1) / total_pages) * 100
-                    self.update_progress(page_num + 1, total_pages, progress_percentage)
-                    
-                    time.sleep(0.02)
-                
-                if self.is_processing:
-                    output_doc.save(output_pdf_path, deflate=True)
-                    output_doc.close()
-                    input_doc.close()
-                    return True, [output_pdf_path]
-                else:
-                    return False, []
-                    
-        except Exception as e:
-            print(f"Error in processing: {e}")
-            return False, []
+                job_status.configure(text=f"❌ {job.error}", text_color="#DC143C")
+        
+        throughput = self.job_queue.throughput()
+        if throughput.pages_total:
+            percentage = throughput.pages_done / throughput.pages_total * 100
+            self.progress_bar.set(percentage / 100)
+            self.progress_percent.configure(text=f"{percentage:.1f}%")
+        self.page_counter.configure(
+            text=f"📄 Pages: {throughput.pages_done}/{throughput.pages_total}  •  "
+                 f"{throughput.pages_per_sec:.1f} pages/s"
+        )
+        self.processing_status.configure(
+            text=f"📚 Files: {throughput.jobs_finished}/{throughput.jobs_total} done",
+            text_color="#FFD700"
+        )
+        
+        if throughput.jobs_finished == throughput.jobs_total:
+            self.on_queue_complete()
     
-    def on_processing_complete(self, success, input_path, output_files):
-        """Handle processing completion"""
+    def on_queue_complete(self):
+        """Summarise every job once the queue has drained"""
+        jobs = self.job_queue.all_jobs()
+        self.job_queue.shutdown(wait=False)
+        self.job_queue = None
         self.is_processing = False
         self.show_main_ui()
         
-        if success:
+        done = [job for job in jobs if job.status == pdf_queue.DONE]
+        if len(done) == len(jobs):
             self.status_label.configure(text="✅ Processing completed successfully!", text_color="#4CAF50")
-            
-            input_size = os.path.getsize(input_path) / 1024 / 1024
-            
-            if len(output_files) > 1:
-                # Multiple files were created
-                output_info = f"📦 Created {len(output_files)} files:\n"
-                for i, file_path in enumerate(output_files):
-                    file_size = os.path.getsize(file_path) / 1024 / 1024
-                    output_info += f"   Part {i+1}: {os.path.basename(file_path)} ({file_size:.1f} MB)\n"
+        elif done:
+            self.status_label.configure(text=f"ℹ️ {len(done)} of {len(jobs)} files processed", text_color="#FF6B35")
+        elif all(job.status == pdf_queue.CANCELLED for job in jobs):
+            self.status_label.configure(text="⏹️ Processing cancelled", text_color="#FF6B35")
+            return
+        else:
+            self.status_label.configure(text="❌ Error occurred!", text_color="#DC143C")
+        
+        lines = []
+        for job in jobs:
+            name = os.path.basename(job.input_path)
+            if job.status == pdf_queue.DONE:
+                counters = job.report["counters"]
+                input_size = counters.get("input_bytes", 0) / 1024 / 1024
+                output_size = counters.get("output_bytes", 0) / 1024 / 1024
+                parts = f"{len(job.output_files)} files, " if len(job.output_files) > 1 else ""
+                over_target = " ⚠️ over target" if job.report.get("tuned_fits") is False else ""
+                lines.append(f"✅ {name}: {parts}{input_size:.1f} MB → {output_size:.1f} MB{over_target}")
+            elif job.status == pdf_queue.CANCELLED:
+                lines.append(f"⏹️ {name}: cancelled")
             else:
-                # Single file was created
-                output_size = os.path.getsize(output_files[0]) / 1024 / 1024
-                output_info = f"📤 Output: {output_size:.1f} MB\n💾 Saved as: {os.path.basename(output_files[0])}"
-            
-            messagebox.showinfo(
-                "Success", 
-                f"PDF processed successfully!\n\n"
-                f"📦 Input: {input_size:.1f} MB\n"
-                f"{output_info}"
-            )
+                lines.append(f"❌ {name}: {job.error}")
+        
+        if done:
+            messagebox.showinfo("Success", "PDF processing finished!\n\n" + "\n".join(lines))
         else:
-            self.status_label.configure(text="ℹ️ Processing completed", text_color="#FF6B35")
-    
-    def on_processing_error(self, error_msg):
-        """Handle processing errors"""
-        self.is_processing = False
-        self.show_main_ui()
-        self.status_label.configure(text="❌ Error occurred!", text_color="#DC143C")
-        messagebox.showerror("Error", f"An error occurred:\n{error_msg}")
+            messagebox.showerror("Error", "An error occurred:\n\n" + "\n".join(lines))
     
     def run(self):
         self.window.mainloop()
@@ -0,0 +1,284 @@
+"""Benchmark harness for the resize engine.
+
+Generates a synthetic PDF corpus locally, runs the engine over a matrix of
+content types, page counts, DPIs and scale factors, and writes the results
+to JSON so two runs can be compared.
+
+    python pdf_bench.py run --pages 10 100 --dpi 150 300 600 -o before.json
+    python pdf_bench.py compare before.json after.json
+
+Every run happens in a fresh process so peak RSS is measured per run.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import fitz  # PyMuPDF
+
+import pdf_engine
+import pdf_stats
+import pdf_writer
+
+CONTENT_TYPES = ["text", "vector", "image", "mixed"]
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "pdf-bench-corpus")
+
+PAGE_SIZES = {
+    "a4": (595, 842),
+    "letter": (612, 792),
+    "a3": (842, 1191),
+    "a5": (420, 595),
+    "a4-landscape": (842, 595),
+}
+
+WORDS = (
+    "print resize scale margin page document render image vector quality "
+    "output split chunk engine worker pipeline archive scan letter form"
+).split()
+
+
+# Corpus generation
+
+def _add_text(page, rng):
+    lines = []
+    for _ in range(45):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))))
+    page.insert_textbox(page.rect + (50, 50, -50, -50), "\n".join(lines), fontsize=10)
+
+
+def _add_vectors(page, rng, count=400):
+    shape = page.new_shape()
+    width, height = page.rect.width, page.rect.height
+    for _ in range(count):
+        p1 = fitz.Point(rng.uniform(0, width), rng.uniform(0, height))
+        p2 = fitz.Point(rng.uniform(0, width), rng.uniform(0, height))
+        if rng.random() < 0.5:
+            shape.draw_line(p1, p2)
+        else:
+            shape.draw_bezier(p1, fitz.Point(rng.uniform(0, width), rng.uniform(0, height)),
+                              fitz.Point(rng.uniform(0, width), rng.uniform(0, height)), p2)
+        shape.finish(color=(rng.random(), rng.random(), rng.random()), width=rng.uniform(0.3, 2))
+    shape.commit()
+
+
+IMAGE_WIDTH, IMAGE_HEIGHT = 400, 500
+_gradient = None
+
+
+def _gradient_samples():
+    global _gradient
+    if _gradient is None:
+        samples = bytearray()
+        for y in range(IMAGE_HEIGHT):
+            for x in range(IMAGE_WIDTH):
+                samples += bytes(((y * 255) // IMAGE_HEIGHT, (x * 255) // IMAGE_WIDTH, ((x + y) * 7) % 256))
+        _gradient = bytes(samples)
+    return _gradient
+
+
+def _add_image(page, rng):
+    # A shared gradient with a random noise patch so no two pages are identical
+    samples = bytearray(_gradient_samples())
+    patch = 64
+    left = rng.randrange(IMAGE_WIDTH - patch)
+    top = rng.randrange(IMAGE_HEIGHT - patch)
+    for y in range(top, top + patch):
+        start = (y * IMAGE_WIDTH + left) * 3
+        samples[start:start + patch * 3] = rng.randbytes(patch * 3)
+    pix = fitz.Pixmap(fitz.csRGB, IMAGE_WIDTH, IMAGE_HEIGHT, bytes(samples), False)
+    page.insert_image(page.rect + (36, 36, -36, -36), stream=pix.tobytes("jpg", jpg_quality=80))
+
+
+def generate_pdf(path, content, pages, seed=0):
+    """Write a synthetic PDF with the given content type and page count"""
+    rng = random.Random(f"{content}-{pages}-{seed}")
+    doc = fitz.open()
+    sizes = list(PAGE_SIZES.values())
+    for _ in range(pages):
+        if content == "mixed":
+            width, height = rng.choice(sizes)
+        else:
+            width, height = PAGE_SIZES["a4"]
+        page = doc.new_page(width=width, height=height)
+        if content in ("text", "mixed"):
+            _add_text(page, rng)
+        if content == "vector":
+            _add_vectors(page, rng)
+        elif content == "mixed":
+            _add_vectors(page, rng, count=60)
+        if content == "image":
+            _add_image(page, rng)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def corpus_file(corpus_dir, content, pages):
+    """Return the path of a corpus document, generating it on first use"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"{content}_{pages}.pdf")
+    if not os.path.exists(path):
+        generate_pdf(path, content, pages)
+    return path
+
+
+# Measurement
+
+def _run_case(input_path, output_dir, scale_factor, dpi, options, queue):
+    """Child process: run one job and report timings and peak RSS"""
+    stats = pdf_stats.JobStats(keep_pages=False)
+    output_path = os.path.join(output_dir, "out.pdf")
+    start = time.perf_counter()
+    success, output_files = pdf_engine.resize_pdf_for_printing(
+        input_path, output_path, scale_factor, dpi, 0, stats=stats, **options
+    )
+    seconds = time.perf_counter() - start
+    stages = stats.report()["stages"]
+
+    output_bytes = sum(os.path.getsize(path) for path in output_files)
+    for path in output_files:
+        os.remove(path)
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+
+    queue.put({
+        "success": success,
+        "seconds": seconds,
+        "save_seconds": stages.get("save", {}).get("seconds", 0.0),
+        "output_bytes": output_bytes,
+        "peak_rss_bytes": peak_bytes,
+        "stage_seconds": {name: stage["seconds"] for name, stage in stages.items()},
+    })
+
+
+def run_case(input_path, scale_factor, dpi, options=None):
+    """Run one job in a fresh process and return its measurements"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as output_dir:
+        process = context.Process(
+            target=_run_case, args=(input_path, output_dir, scale_factor, dpi, options or {}, queue)
+        )
+        process.start()
+        result = queue.get()
+        process.join()
+    return result
+
+
+def run_matrix(args):
+    results = []
+    for content in args.content:
+        for pages in args.pages:
+            input_path = corpus_file(args.corpus_dir, content, pages)
+            for dpi in args.dpi:
+                for scale in args.scale:
+                    for save_profile in args.save_profile:
+                        options = {"workers": args.workers, "render_mode": args.mode, "save_profile": save_profile}
+                        measured = run_case(input_path, scale, dpi, options)
+                        pages_per_sec = pages / measured["seconds"] if measured["seconds"] else 0.0
+                        row = {
+                            "content": content,
+                            "pages": pages,
+                            "dpi": dpi,
+                            "scale": scale,
+                            "mode": args.mode,
+                            "workers": args.workers,
+                            "save_profile": save_profile,
+                            "input_bytes": os.path.getsize(input_path),
+                            "pages_per_sec": pages_per_sec,
+                            **measured,
+                        }
+                        results.append(row)
+                        print(
+                            f"{content:>6} {pages:>5}p {dpi:>3}dpi x{scale:.2f} {save_profile:>5}  "
+                            f"{pages_per_sec:8.1f} pages/s  "
+                            f"rss {row['peak_rss_bytes'] / 1024 / 1024:7.1f} MB  "
+                            f"out {row['output_bytes'] / 1024 / 1024:8.2f} MB  "
+                            f"save {row['save_seconds']:6.2f}s"
+                        )
+    return results
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# Comparison
+
+def case_key(row):
+    return (row["content"], row["pages"], row["dpi"], row["scale"], row.get("mode"), row.get("workers"),
+            row.get("save_profile", pdf_writer.DEFAULT_SAVE_PROFILE))
+
+
+def compare(before_path, after_path):
+    """Print per-case ratios of after/before for two result files"""
+    with open(before_path) as f:
+        before = {case_key(row): row for row in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {case_key(row): row for row in json.load(f)["results"]}
+
+    print(f"{'case':<32} {'pages/s':>10} {'peak rss':>10} {'output':>10} {'save':>10}")
+    for key in sorted(set(before) & set(after), key=str):
+        old, new = before[key], after[key]
+
+        def ratio(field):
+            return f"{new[field] / old[field]:.2f}x" if old[field] else "n/a"
+
+        content, pages, dpi, scale = key[:4]
+        label = f"{content} {pages}p {dpi}dpi x{scale} {key[6]}"
+        print(f"{label:<32} {ratio('pages_per_sec'):>10} {ratio('peak_rss_bytes'):>10} "
+              f"{ratio('output_bytes'):>10} {ratio('save_seconds'):>10}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pdf_bench", description="Benchmark the PDF resize engine.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark matrix")
+    run.add_argument("--content", nargs="+", default=CONTENT_TYPES, choices=CONTENT_TYPES)
+    run.add_argument("--pages", nargs="+", type=int, default=[10, 100],
+                     help="page counts to generate, e.g. 10 100 500 2000")
+    run.add_argument("--dpi", nargs="+", type=int, default=[150, 300, 600], choices=pdf_engine.DPI_OPTIONS)
+    run.add_argument("--scale", nargs="+", type=float, default=[pdf_engine.DEFAULT_SCALE_FACTOR])
+    run.add_argument("--mode", default=pdf_engine.DEFAULT_RENDER_MODE, choices=pdf_engine.RENDER_MODES)
+    run.add_argument("--workers", type=int, default=pdf_engine.DEFAULT_WORKERS)
+    run.add_argument("--save-profile", nargs="+", default=[pdf_writer.DEFAULT_SAVE_PROFILE],
+                     choices=pdf_writer.SAVE_PROFILES, help="save profiles to compare, e.g. fast small web")
+    run.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    run.add_argument("-o", "--output", default="bench_results.json", help="JSON results file")
+
+    cmp_parser = commands.add_parser("compare", help="compare two JSON result files")
+    cmp_parser.add_argument("before")
+    cmp_parser.add_argument("after")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "compare":
+        compare(args.before, args.after)
+        return 0
+
+    results = run_matrix(args)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0 if all(row["success"] for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
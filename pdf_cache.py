@@ -0,0 +1,161 @@
+"""Opt-in on-disk cache of finished outputs and rendered pages.
+
+Entries are keyed by the SHA-256 of the input file plus every setting that
+affects the bytes produced, so a repeat job with identical settings is just
+a file copy, and a job that only changes the split setting reuses every
+rendered page.
+
+    <cache_dir>/outputs/<job key>/manifest.json, part files
+    <cache_dir>/pages/<key[:2]>/<page key>.pkl
+
+The cache is trimmed to max_bytes by evicting the least recently used
+entries. Page entries are pickled, so only point it at a directory you
+trust.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf-resizer")
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """Hash any repr-able settings into a cache key"""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class ResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.outputs_dir = os.path.join(cache_dir, "outputs")
+        self.pages_dir = os.path.join(cache_dir, "pages")
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        os.makedirs(self.pages_dir, exist_ok=True)
+
+    # Finished outputs
+
+    def get_outputs(self, job_key, output_paths_for):
+        """Copy a cached job's parts to their destinations.
+
+        output_paths_for(part_count) must return the destination paths.
+        Returns the list of written paths, or None on a miss.
+        """
+        entry_dir = os.path.join(self.outputs_dir, job_key)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        try:
+            with open(manifest_path) as f:
+                parts = json.load(f)["parts"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        destinations = output_paths_for(len(parts))
+        for part, destination in zip(parts, destinations):
+            shutil.copyfile(os.path.join(entry_dir, part), destination)
+        _touch(manifest_path)
+        return destinations
+
+    def put_outputs(self, job_key, output_files):
+        """Store copies of a finished job's output files"""
+        entry_dir = os.path.join(self.outputs_dir, job_key)
+        staging_dir = tempfile.mkdtemp(dir=self.outputs_dir)
+        try:
+            parts = []
+            for index, path in enumerate(output_files):
+                part = f"part{index + 1}.pdf"
+                shutil.copyfile(path, os.path.join(staging_dir, part))
+                parts.append(part)
+            with open(os.path.join(staging_dir, "manifest.json"), "w") as f:
+                json.dump({"parts": parts}, f)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(staging_dir, entry_dir)
+        finally:
+            if os.path.isdir(staging_dir):
+                shutil.rmtree(staging_dir)
+
+    # Rendered pages
+
+    def _page_path(self, page_key):
+        return os.path.join(self.pages_dir, page_key[:2], page_key + ".pkl")
+
+    def has_page(self, page_key):
+        return os.path.exists(self._page_path(page_key))
+
+    def get_page(self, page_key):
+        """Return the cached (rect, tiles) for page_key, or None"""
+        path = self._page_path(page_key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        _touch(path)
+        return value
+
+    def put_page(self, page_key, rect, tiles):
+        """Store a page's rendered tiles; rect is stored as a plain tuple"""
+        path = self._page_path(page_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((tuple(rect), list(tiles)), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    # Eviction
+
+    def _entries(self):
+        """Yield (last_used, size, path, is_dir) for every cache entry"""
+        for name in os.listdir(self.outputs_dir):
+            entry_dir = os.path.join(self.outputs_dir, name)
+            manifest_path = os.path.join(entry_dir, "manifest.json")
+            if not os.path.exists(manifest_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+            yield os.path.getmtime(manifest_path), size, entry_dir, True
+
+        for shard in os.listdir(self.pages_dir):
+            shard_dir = os.path.join(self.pages_dir, shard)
+            for entry in os.scandir(shard_dir):
+                stat = entry.stat()
+                yield stat.st_mtime, stat.st_size, entry.path, False
+
+    def size(self):
+        return sum(size for _, size, _, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, path, is_dir in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                if is_dir:
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        return total
@@ -0,0 +1,359 @@
+"""Command-line entry point for PDF Resizer Pro.
+
+Runs the resize engine without any GUI toolkit so it can be driven from cron
+jobs and pipelines on headless machines.
+
+    python pdf_cli.py scans/ "reports/*.pdf" -s 90 -d 300 -p 10 -o out/
+    fetch-scan | python pdf_cli.py - --stdout | upload-scan
+"""
+import argparse
+import os
+import sys
+import threading
+
+# PyMuPDF writes its own messages to stdout, which --stdout needs for the PDF.
+# Must be set before PyMuPDF is first imported.
+os.environ.setdefault("PYMUPDF_MESSAGE", "fd:2")
+
+import pdf_cache
+import pdf_encoding
+import pdf_engine
+import pdf_estimate
+import pdf_journal
+from pdf_progress import format_eta
+import pdf_queue
+from pdf_queue import collect_input_files
+import pdf_stats
+import pdf_writer
+
+STDIN = "-"
+
+
+def print_progress(update):
+    """Write a single, self-overwriting progress line to stderr"""
+    sys.stderr.write(
+        f"\r  {update.current}/{update.total} pages ({update.percentage:5.1f}%)  "
+        f"{update.pages_per_sec:6.1f} pages/s  ETA {format_eta(update.eta)}  "
+    )
+    if update.current >= update.total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def add_job_arguments(parser):
+    """Add the options that control how each file is processed"""
+    parser.add_argument("-s", "--scale", type=int, default=int(pdf_engine.DEFAULT_SCALE_FACTOR * 100),
+                        help="scale factor in percent, 50-100 (default: %(default)s)")
+    parser.add_argument("-d", "--dpi", type=int, default=pdf_engine.DEFAULT_DPI,
+                        choices=pdf_engine.DPI_OPTIONS, help="render resolution (default: %(default)s)")
+    parser.add_argument("-p", "--max-pages", type=int, default=pdf_engine.DEFAULT_MAX_PAGES_PER_FILE,
+                        help="max pages per output file, 0 = no split (default: %(default)s)")
+    parser.add_argument("-m", "--mode", default=pdf_engine.DEFAULT_RENDER_MODE,
+                        choices=pdf_engine.RENDER_MODES,
+                        help="raster renders pages to images, vector keeps them as vectors (default: %(default)s)")
+    parser.add_argument("-f", "--image-format", default=pdf_encoding.DEFAULT_ENCODING.image_format,
+                        choices=pdf_encoding.IMAGE_FORMATS,
+                        help="encoder for rendered pages (default: %(default)s)")
+    parser.add_argument("--quality", type=int, default=pdf_encoding.DEFAULT_JPEG_QUALITY,
+                        help="jpeg/jpx quality, 1-100 (default: %(default)s)")
+    parser.add_argument("-c", "--colorspace", default=pdf_encoding.DEFAULT_ENCODING.colorspace,
+                        choices=pdf_encoding.COLORSPACES,
+                        help="colorspace pages are stored in; mono is 1-bit, auto picks the smallest that fits each page "
+                             "(needs numpy) (default: %(default)s)")
+    parser.add_argument("--max-pixmap-mb", type=int,
+                        default=pdf_engine.DEFAULT_MAX_PIXMAP_BYTES // (1024 * 1024),
+                        help="render pages in tiles when a page bitmap would exceed this, 0 = never (default: %(default)s)")
+    parser.add_argument("--flush-mb", type=int, default=pdf_writer.DEFAULT_FLUSH_BYTES // (1024 * 1024),
+                        help="write pages to disk every this many MB so memory stays bounded, 0 = only at the end of each part (default: %(default)s)")
+    parser.add_argument("--save-profile", default=pdf_writer.DEFAULT_SAVE_PROFILE, choices=pdf_writer.SAVE_PROFILES,
+                        help="fast writes quickest, small rewrites each part with object streams and unused objects "
+                             "removed, web (only where MuPDF can still linearize) writes fast-web-view files "
+                             "(default: %(default)s)")
+    parser.add_argument("--no-dedup", dest="deduplicate", action="store_false",
+                        help="render every page even when its content repeats an earlier page")
+    parser.add_argument("--drop-blank", action="store_true",
+                        help="leave out pages that --colorspace auto finds blank")
+    parser.add_argument("-w", "--workers", type=int, default=pdf_engine.DEFAULT_WORKERS,
+                        help="worker processes used to render pages of each file (default: %(default)s)")
+    parser.add_argument("-b", "--max-mb", type=float, default=0,
+                        help="start a new output part before one would exceed this many MB, 0 = no limit (default: %(default)s)")
+    parser.add_argument("-t", "--target-mb", type=float, default=0,
+                        help="pick the DPI (and jpeg/jpx quality) so the output is about this many MB; "
+                             "--dpi and --quality become upper bounds (default: off)")
+
+
+def check_job_arguments(parser, args):
+    """Validate the options added by add_job_arguments"""
+    if not 50 <= args.scale <= 100:
+        parser.error("scale must be between 50 and 100")
+    if args.max_pages < 0:
+        parser.error("max pages per file must be a positive number or 0")
+    if args.max_mb < 0:
+        parser.error("max MB per file must be a positive number or 0")
+    if args.workers < 1:
+        parser.error("workers must be at least 1")
+    if args.max_pixmap_mb < 0:
+        parser.error("max pixmap size must be a positive number or 0")
+    if args.flush_mb < 0:
+        parser.error("flush size must be a positive number or 0")
+    if not 1 <= args.quality <= 100:
+        parser.error("quality must be between 1 and 100")
+    if args.target_mb < 0:
+        parser.error("target size must be a positive number or 0")
+    if args.target_mb and args.mode != "raster":
+        parser.error("--target-mb only applies to raster mode")
+    if args.drop_blank and (args.mode != "raster" or args.colorspace != "auto"):
+        parser.error("--drop-blank needs raster mode and --colorspace auto")
+
+
+def job_encoding(args):
+    return pdf_encoding.ImageEncoding(args.image_format, args.quality, args.colorspace)
+
+
+def job_engine_options(args):
+    """Engine keyword options for the settings added by add_job_arguments (encoding excluded)"""
+    return {
+        "workers": args.workers,
+        "render_mode": args.mode,
+        "max_pixmap_bytes": args.max_pixmap_mb * 1024 * 1024,
+        "deduplicate": args.deduplicate,
+        "max_bytes_per_file": int(args.max_mb * 1024 * 1024),
+        "flush_bytes": args.flush_mb * 1024 * 1024,
+        "drop_blank_pages": args.drop_blank,
+        "save_profile": args.save_profile,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="pdf_cli",
+        description="Resize and optimize PDF files for printing (headless)."
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files, glob patterns or directories; - reads one PDF from stdin")
+    add_job_arguments(parser)
+    parser.add_argument("--cache", action="store_true",
+                        help=f"reuse outputs and rendered pages from earlier runs (stored in {pdf_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-dir", help="use this cache directory (implies --cache)")
+    parser.add_argument("--cache-size-mb", type=int,
+                        default=pdf_cache.DEFAULT_MAX_CACHE_BYTES // (1024 * 1024),
+                        help="evict least recently used cache entries above this size (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="files processed at the same time, each in its own process (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted split job from its journal, keeping the parts it verified")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only print projected time, output size and part count from a page sample")
+    parser.add_argument("-o", "--output-dir",
+                        help="directory for output files (default: next to each input)")
+    parser.add_argument("--stdout", action="store_true",
+                        help="write the output PDF to stdout (one input; implies -p 0, since parts cannot be "
+                             "split on a stream); messages go to stderr")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="search directories recursively")
+    parser.add_argument("--progress", action="store_true",
+                        help="show page progress, rate and ETA on stderr")
+    parser.add_argument("--stats", action="store_true",
+                        help="print a per-stage timing table after each file")
+    parser.add_argument("--stats-log", metavar="FILE",
+                        help="append one JSON line of stage timings and byte counts per file")
+    parser.add_argument("--stats-pages", action="store_true",
+                        help="include per-page timings in --stats-log lines")
+    parser.add_argument("--profile", choices=pdf_stats.PROFILE_MODES,
+                        help="profile each file with cProfile (writes <output>.prof) or tracemalloc")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    check_job_arguments(parser, args)
+    if args.jobs < 1:
+        parser.error("jobs must be at least 1")
+    if args.jobs > 1 and args.profile:
+        parser.error("--profile needs --jobs 1")
+    if STDIN in args.inputs and len(args.inputs) > 1:
+        parser.error("stdin (-) must be the only input")
+    if args.stdout:
+        if args.max_mb:
+            parser.error("--stdout writes a single PDF; drop --max-mb")
+        args.max_pages = 0
+        if args.estimate or args.output_dir:
+            parser.error("--stdout cannot be combined with --estimate or --output-dir")
+
+    files = [STDIN] if args.inputs == [STDIN] else collect_input_files(args.inputs, args.recursive)
+    if not files:
+        print("Error: no PDF files found", file=sys.stderr)
+        return 2
+    if args.stdout and len(files) > 1:
+        parser.error(f"--stdout needs exactly one input file, got {len(files)}")
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = pdf_cache.ResultCache(
+            args.cache_dir or pdf_cache.DEFAULT_CACHE_DIR, args.cache_size_mb * 1024 * 1024
+        )
+
+    scale_factor = args.scale / 100
+    encoding = job_encoding(args)
+    engine_options = dict(job_engine_options(args), cache=cache, resume=args.resume)
+
+    if args.jobs > 1 and not args.estimate and not args.stdout and files != [STDIN]:
+        return run_queued(args, files, scale_factor, encoding, engine_options)
+
+    stdout = None
+    if args.stdout:
+        # Keep every message, including the engine's, out of the PDF
+        stdout = sys.stdout.buffer
+        sys.stdout = sys.stderr
+
+    failures = 0
+    for input_path in files:
+        output_path = output_path_for(args, input_path)
+        stats = pdf_stats.JobStats(keep_pages=args.stats_pages)
+        profile_path = os.path.splitext(output_path)[0] + ".prof"
+        dpi, file_encoding = args.dpi, encoding
+        source = input_path
+        if input_path == STDIN:
+            source = sys.stdin.buffer.read()
+            input_path = "<stdin>"
+
+        if args.estimate:
+            try:
+                estimate = pdf_estimate.estimate_job(
+                    source, scale_factor, args.dpi, args.max_pages,
+                    render_mode=args.mode,
+                    encoding=encoding,
+                    max_bytes_per_file=int(args.max_mb * 1024 * 1024),
+                    workers=args.workers,
+                    max_pixmap_bytes=args.max_pixmap_mb * 1024 * 1024
+                )
+            except Exception as e:
+                failures += 1
+                print(f"Failed: {input_path}: {e}", file=sys.stderr)
+                continue
+            print(f"{input_path}: {estimate.pages} pages, ~{estimate.output_bytes / 1024 / 1024:.1f} MB "
+                  f"in {estimate.parts} file(s), about {format_eta(estimate.seconds)}")
+            continue
+
+        if args.target_mb:
+            try:
+                tuned = pdf_estimate.tune_for_target_size(
+                    source, int(args.target_mb * 1024 * 1024), scale_factor, encoding,
+                    dpi_options=[d for d in pdf_engine.DPI_OPTIONS if d <= args.dpi],
+                    max_pixmap_bytes=args.max_pixmap_mb * 1024 * 1024
+                )
+            except Exception as e:
+                failures += 1
+                print(f"Failed: {input_path}: {e}", file=sys.stderr)
+                continue
+            dpi, file_encoding = tuned.dpi, tuned.encoding
+            stats.info["tuned_dpi"] = dpi
+            stats.info["tuned_quality"] = file_encoding.quality
+            stats.info["tuned_fits"] = tuned.fits
+            stats.info["tuned_estimated_bytes"] = tuned.estimated_bytes
+            if not args.quiet:
+                print(f"{input_path}: {dpi} DPI, quality {file_encoding.quality}, "
+                      f"~{tuned.estimated_bytes / 1024 / 1024:.1f} MB estimated")
+
+        with pdf_stats.profiling(args.profile, profile_path, stats):
+            success, output_files = pdf_engine.resize_pdf_for_printing(
+                source, output_path, scale_factor, dpi, args.max_pages,
+                encoding=file_encoding,
+                stats=stats,
+                progress_callback=print_progress if args.progress else None,
+                output_sink=(lambda part_index: stdout) if stdout is not None else None,
+                **engine_options
+            )
+        if stdout is not None:
+            stdout.flush()
+            output_files = ["<stdout>"] if success else []
+
+        if not report_result(args, input_path, success, output_files, stats.report()):
+            failures += 1
+
+    return 1 if failures else 0
+
+
+def output_path_for(args, input_path):
+    """Output name for input_path, reusing an unfinished job's name with --resume"""
+    if input_path == STDIN:
+        return pdf_engine.make_output_filename("stdin.pdf", args.output_dir or "")
+    output_dir = args.output_dir or os.path.dirname(input_path)
+    if args.resume:
+        unfinished = pdf_journal.find_resumable_jobs(input_path, output_dir)
+        if unfinished:
+            return unfinished[-1]["output"]
+    return pdf_engine.make_output_filename(input_path, output_dir)
+
+
+def report_result(args, input_path, success, output_files, report, error=None):
+    """Print and log one finished file; returns success"""
+    if args.stats_log:
+        with open(args.stats_log, "a") as log:
+            log.write(pdf_stats.report_json_line(report, include_pages=args.stats_pages) + "\n")
+
+    if not success:
+        print(f"Failed: {input_path}" + (f": {error}" if error else ""), file=sys.stderr)
+        return False
+    if report.get("tuned_fits") is False:
+        print(f"Warning: {input_path} was estimated at {report['tuned_estimated_bytes'] / 1024 / 1024:.1f} MB "
+              f"even at the lowest settings", file=sys.stderr)
+    if not args.quiet:
+        if args.jobs > 1 and "tuned_dpi" in report:
+            print(f"{input_path}: {report['tuned_dpi']} DPI, quality {report['tuned_quality']}")
+        if report.get("resumed_from_page"):
+            print(f"{input_path}: resumed from page {report['resumed_from_page'] + 1}")
+        for path in output_files:
+            print(f"{input_path} -> {path}")
+        if args.stats:
+            print(pdf_stats.format_summary(report))
+    return True
+
+
+def run_queued(args, files, scale_factor, encoding, engine_options):
+    """Process files through a pdf_queue.JobQueue, args.jobs at a time"""
+    output_lock = threading.Lock()
+    failures = []
+
+    def on_update(job):
+        with output_lock:
+            if job.finished:
+                if args.progress:
+                    sys.stderr.write("\n")
+                if job.status == pdf_queue.CANCELLED:
+                    failures.append(job)
+                    print(f"Cancelled: {job.input_path}", file=sys.stderr)
+                elif not report_result(args, job.input_path, job.status == pdf_queue.DONE,
+                                       job.output_files, job.report or {"total_seconds": 0, "stages": {}},
+                                       job.error):
+                    failures.append(job)
+            elif args.progress:
+                total = job_queue.throughput()
+                sys.stderr.write(
+                    f"\r  {total.jobs_finished}/{total.jobs_total} files  "
+                    f"{total.pages_done}/{total.pages_total} pages  {total.pages_per_sec:6.1f} pages/s  "
+                )
+                sys.stderr.flush()
+
+    job_queue = pdf_queue.JobQueue(args.jobs, on_update=on_update, keep_pages=args.stats_pages)
+    try:
+        for input_path in files:
+            job_queue.submit(
+                input_path, output_path_for(args, input_path), scale_factor, args.dpi, args.max_pages,
+                target_bytes=int(args.target_mb * 1024 * 1024), encoding=encoding, **engine_options
+            )
+        job_queue.wait()
+    except KeyboardInterrupt:
+        job_queue.shutdown(cancel=True)
+        return 130
+    job_queue.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
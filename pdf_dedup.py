@@ -0,0 +1,121 @@
+"""Detect repeated pages so each distinct page is rendered and stored once.
+
+A page's fingerprint covers everything that affects how it renders: its
+content stream, its resource dictionary (fonts, images and so on are
+identified by xref, so only genuinely shared resources match), annotations,
+size and rotation. Pages with equal fingerprints render identically.
+"""
+from collections import OrderedDict
+import hashlib
+
+from pdf_encoding import encoded_size
+
+DEFAULT_MAX_CACHED_BYTES = 64 * 1024 * 1024
+
+
+def _inherited_key(doc, xref, key):
+    """Look up key on a page object, following /Parent for inheritable entries"""
+    seen = set()
+    while xref and xref not in seen:
+        seen.add(xref)
+        kind, value = doc.xref_get_key(xref, key)
+        if kind != "null":
+            return kind, value
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+    return "null", "null"
+
+
+def page_fingerprint(doc, page_num):
+    """Return a hex digest identifying how page page_num of doc renders"""
+    page = doc.load_page(page_num)
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+
+    kind, resources = _inherited_key(doc, page.xref, "Resources")
+    if kind == "xref":
+        resources = doc.xref_object(int(resources.split()[0]), compressed=True)
+    digest.update(resources.encode())
+
+    digest.update(doc.xref_get_key(page.xref, "Annots")[1].encode())
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    return digest.hexdigest()
+
+
+class PageDeduplicator:
+    """Tracks rendered pages by fingerprint for one run.
+
+    scan() fingerprints every page up front so the engine knows which pages
+    are first occurrences (the only ones that need rendering). Within one
+    output document a repeated page just references the image xrefs that
+    were already inserted. Encoded tiles of pages that repeat in a later
+    split part are kept in a byte-bounded LRU so they can be inserted again
+    without re-rendering.
+    """
+
+    def __init__(self, max_cached_bytes=DEFAULT_MAX_CACHED_BYTES):
+        self.max_cached_bytes = max_cached_bytes
+        self.fingerprints = []
+        self.first_page = {}
+        self.last_page = {}
+        self.placed = {}
+        self.encoded = OrderedDict()
+        self.cached_bytes = 0
+
+    def scan(self, doc):
+        """Fingerprint every page of doc"""
+        self.fingerprints = [page_fingerprint(doc, page_num) for page_num in range(len(doc))]
+        self.first_page = {}
+        self.last_page = {}
+        for page_num, fingerprint in enumerate(self.fingerprints):
+            self.first_page.setdefault(fingerprint, page_num)
+            self.last_page[fingerprint] = page_num
+
+    def first_occurrences(self, start_page=0):
+        """Pages at or after start_page whose content has not appeared since start_page"""
+        seen = set()
+        pages = []
+        for page_num in range(start_page, len(self.fingerprints)):
+            fingerprint = self.fingerprints[page_num]
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                pages.append(page_num)
+        return pages
+
+    def repeats_from(self, page_num, later_page):
+        """True if page page_num's content appears again at or after later_page"""
+        return self.last_page[self.fingerprints[page_num]] >= later_page
+
+    def start_output(self):
+        """Forget xrefs placed in the previous output document"""
+        self.placed = {}
+
+    def placed_images(self, page_num):
+        """Return (rect, [(tile_rect, xref), ...]) already placed in the current output, or None"""
+        return self.placed.get(self.fingerprints[page_num])
+
+    def cached_tiles(self, page_num):
+        """Return (rect, tiles) kept from an earlier render, or None"""
+        fingerprint = self.fingerprints[page_num]
+        cached = self.encoded.get(fingerprint)
+        if cached is not None:
+            self.encoded.move_to_end(fingerprint)
+        return cached
+
+    def remember(self, page_num, rect, images, tiles=None):
+        """Record the images placed for page_num and optionally cache its encoded tiles"""
+        fingerprint = self.fingerprints[page_num]
+        self.placed[fingerprint] = (rect, images)
+        if tiles is None or fingerprint in self.encoded:
+            return
+
+        size = sum(encoded_size(encoded) for _, encoded in tiles)
+        if size > self.max_cached_bytes:
+            return
+        self.encoded[fingerprint] = (rect, tiles)
+        self.cached_bytes += size
+        while self.cached_bytes > self.max_cached_bytes:
+            _, (_, evicted) = self.encoded.popitem(last=False)
+            self.cached_bytes -= sum(encoded_size(encoded) for _, encoded in evicted)
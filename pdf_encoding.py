@@ -0,0 +1,265 @@
+"""Image encoding for rendered pages.
+
+A page is rendered straight into the colorspace it will be stored in, then
+encoded with one of:
+
+    flate  lossless (the original behaviour)
+    jpeg   DCT with a 1-100 quality setting
+    jpx    JPEG 2000 with a 1-100 quality setting (needs Pillow); pages
+           that Flate stores smaller, such as plain text, are kept as Flate
+
+Colorspace "mono" always produces a 1-bit Flate image regardless of format,
+since lossy codecs do not help bi-level content.
+
+Colorspace "auto" (needs NumPy) renders in RGB and classifies every page
+from its samples as blank, mono, gray or color, then stores it in the
+smallest colorspace that keeps it intact: blank and mono pages as 1-bit
+Flate, gray pages as 8-bit gray and only color pages as RGB.
+"""
+from collections import namedtuple
+from functools import lru_cache
+import io
+import zlib
+
+import fitz  # PyMuPDF
+
+IMAGE_FORMATS = ["flate", "jpeg", "jpx"]
+COLORSPACES = ["rgb", "gray", "mono", "auto"]
+DEFAULT_JPEG_QUALITY = 85
+MONO_THRESHOLD = 128
+# JPX quality q targets a PSNR of JPX_BASE_DB + q * JPX_DB_PER_QUALITY: 85 -> 42 dB, 50 -> 35 dB
+JPX_BASE_DB = 25
+JPX_DB_PER_QUALITY = 0.2
+
+# Page classification for colorspace "auto". Fractions are of all pixels.
+PAGE_CLASSES = ["blank", "mono", "gray", "color"]
+INK_LEVEL = 250                 # gray levels below this count as ink, so pale fills are not blank
+BLANK_INK_FRACTION = 0.00002    # at most this much ink: blank (a lone "1" is more)
+COLOR_SPREAD = 16               # channel spread above this makes a pixel colored
+COLOR_PIXEL_FRACTION = 0.001    # more colored pixels than this: color
+MIDTONE_RANGE = (64, 250)       # gray levels strictly between these are midtones, light shading included
+MONO_MIDTONE_FRACTION = 0.035   # at most this many midtones: mono (text edges stay below it) ...
+FLAT_FILL_FRACTION = 0.005      # ... and at most this many on any one midtone level (shading is flat)
+HISTOGRAM_ROWS = 256            # rows per bincount call, which widens samples to 8 bytes each
+
+ImageEncoding = namedtuple("ImageEncoding", ["image_format", "quality", "colorspace"])
+DEFAULT_ENCODING = ImageEncoding("flate", DEFAULT_JPEG_QUALITY, "rgb")
+
+# Encoded page images are (kind, payload) pairs:
+#   ("stream", bytes)  JPEG/JPX file data, embedded as-is
+#   ("flate", (width, height, colorspace, bits_per_component, data))
+#                      zlib-compressed samples written straight into an
+#                      image XObject, so the output document never holds
+#                      uncompressed pixels
+
+
+def validate_encoding(encoding):
+    """Raise ValueError if encoding has an unknown format, colorspace or quality"""
+    if encoding.image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {encoding.image_format}")
+    if encoding.colorspace not in COLORSPACES:
+        raise ValueError(f"Unknown colorspace: {encoding.colorspace}")
+    if not 1 <= encoding.quality <= 100:
+        raise ValueError("Image quality must be between 1 and 100")
+
+
+def render_colorspace(encoding):
+    """Return the fitz colorspace pages should be rendered in for this encoding"""
+    if encoding.colorspace in ("rgb", "auto"):
+        return fitz.csRGB
+    return fitz.csGRAY
+
+
+@lru_cache(maxsize=None)
+def _load_numpy():
+    """Import NumPy on first use, so jobs that never need it skip its import time; None if missing"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def pack_bits(samples, width, height, threshold=MONO_THRESHOLD):
+    """Threshold 8-bit gray samples and pack them into 1-bit rows padded to whole bytes.
+
+    Works on whole buffers with bytes/int operations so it stays in C even
+    for very large pages.
+    """
+    # 0xFF where the pixel is white, 0x00 where it is ink
+    table = bytes(0xFF if v >= threshold else 0x00 for v in range(256))
+    levels = bytes(samples).translate(table)
+
+    if width % 8:
+        pad = b"\xff" * (8 - width % 8)
+        levels = b"".join(levels[row * width:(row + 1) * width] + pad for row in range(height))
+
+    numpy = _load_numpy()
+    if numpy is not None:
+        rows = numpy.frombuffer(levels, dtype=numpy.uint8).reshape(height, -1)
+        return numpy.packbits(rows, axis=1).tobytes()
+
+    # Byte j of every group of eight supplies bit (7 - j) of the packed byte
+    group_count = len(levels) // 8
+    packed = 0
+    for j in range(8):
+        bit_mask = int.from_bytes(bytes([1 << (7 - j)]) * group_count, "big")
+        packed |= int.from_bytes(levels[j::8], "big") & bit_mask
+    return packed.to_bytes(group_count, "big")
+
+
+def samples_array(pix):
+    """View a pixmap's samples as a (height, width, n) uint8 array without copying.
+
+    The array shares the pixmap's memory, so keep the pixmap alive while it
+    is in use.
+    """
+    numpy = _load_numpy()
+    return numpy.frombuffer(pix.samples_mv, dtype=numpy.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+def color_counts(pix):
+    """Return (pixels, ink, colored) counts for a pixmap's samples"""
+    numpy = _load_numpy()
+    if numpy is None:
+        raise RuntimeError("Colorspace auto requires NumPy (pip install numpy)")
+    pixels = pix.width * pix.height
+    if pix.n == 1:
+        return pixels, numpy.count_nonzero(samples_array(pix) < INK_LEVEL), 0
+
+    # Channel views rather than max(axis=2): reducing over the interleaved axis is far slower
+    samples = samples_array(pix)
+    red, green, blue = samples[:, :, 0], samples[:, :, 1], samples[:, :, 2]
+    darkest = numpy.minimum(numpy.minimum(red, green), blue)
+    spread = numpy.maximum(numpy.maximum(red, green), blue)
+    spread -= darkest
+    return pixels, numpy.count_nonzero(darkest < INK_LEVEL), numpy.count_nonzero(spread > COLOR_SPREAD)
+
+
+def midtone_counts(gray):
+    """Return (midtones, flat) for an 8-bit gray pixmap.
+
+    midtones is the number of pixels strictly inside MIDTONE_RANGE and flat
+    the largest number of them sharing one gray level. Anti-aliased text
+    edges spread over every level; a shaded area piles up on one.
+    """
+    numpy = _load_numpy()
+    samples = samples_array(gray)
+    histogram = numpy.zeros(256, dtype=numpy.int64)
+    for top in range(0, gray.height, HISTOGRAM_ROWS):
+        histogram += numpy.bincount(samples[top:top + HISTOGRAM_ROWS].ravel(), minlength=256)
+    low, high = MIDTONE_RANGE
+    midtones = histogram[low + 1:high]
+    return int(midtones.sum()), int(midtones.max())
+
+
+def class_from_counts(pixels, ink, colored, midtones, flat):
+    """Page class for pixel counts summed over one page"""
+    pixels = pixels or 1
+    # Color first: a page of pale color fills has color but hardly any ink
+    if colored > COLOR_PIXEL_FRACTION * pixels:
+        return "color"
+    if ink <= BLANK_INK_FRACTION * pixels:
+        return "blank"
+    if midtones <= MONO_MIDTONE_FRACTION * pixels and flat <= FLAT_FILL_FRACTION * pixels:
+        return "mono"
+    return "gray"
+
+
+def classify_pixmap(pix):
+    """Classify a rendered page as "blank", "mono", "gray" or "color".
+
+    Returns (page_class, gray) where gray is the page as an 8-bit gray
+    pixmap (pix itself if it already is one), or None for color pages.
+    """
+    pixels, ink, colored = color_counts(pix)
+    if class_from_counts(pixels, ink, colored, pixels, pixels) == "color":
+        return "color", None
+    gray = pix if pix.n == 1 else fitz.Pixmap(fitz.csGRAY, pix)
+    return class_from_counts(pixels, ink, colored, *midtone_counts(gray)), gray
+
+
+def encode_classified(pix, gray, page_class, encoding):
+    """Encode pix in the smallest colorspace for page_class (see encode_pixmap)"""
+    if page_class == "color":
+        return encode_pixmap(pix, encoding._replace(colorspace="rgb"))
+    if page_class == "gray":
+        return encode_pixmap(gray, encoding._replace(colorspace="gray"))
+    encoded = encode_pixmap(gray, encoding._replace(colorspace="mono"))
+    return ("blank", encoded) if page_class == "blank" else encoded
+
+
+def _encode_jpx(pix, quality):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("JPEG 2000 encoding requires Pillow (pip install pillow)")
+
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples_mv)
+    buffer = io.BytesIO()
+    if quality >= 100:
+        image.save(buffer, format="JPEG2000", irreversible=False)
+    else:
+        # A fidelity target rather than a fixed ratio, so simple pages come out small
+        image.save(buffer, format="JPEG2000", quality_mode="dB",
+                   quality_layers=[JPX_BASE_DB + quality * JPX_DB_PER_QUALITY], irreversible=True)
+    return buffer.getvalue()
+
+
+def encode_pixmap(pix, encoding):
+    """Encode a rendered pixmap into a (kind, payload) pair that can cross process boundaries.
+
+    With colorspace "auto" a blank page comes back as ("blank", encoded),
+    wrapping its 1-bit encoding, so callers can recognise and drop it.
+    """
+    if encoding.colorspace == "auto":
+        page_class, gray = classify_pixmap(pix)
+        return encode_classified(pix, gray, page_class, encoding)
+    if encoding.colorspace == "mono":
+        packed = pack_bits(pix.samples_mv, pix.width, pix.height)
+        return "flate", (pix.width, pix.height, "DeviceGray", 1, zlib.compress(packed))
+    if encoding.image_format == "jpeg":
+        return "stream", pix.tobytes("jpg", jpg_quality=encoding.quality)
+    colorspace = "DeviceGray" if pix.n == 1 else "DeviceRGB"
+    flate = "flate", (pix.width, pix.height, colorspace, 8, zlib.compress(pix.samples_mv))
+    if encoding.image_format == "jpx":
+        data = _encode_jpx(pix, encoding.quality)
+        return ("stream", data) if len(data) < encoded_size(flate) else flate
+    return flate
+
+
+def encoded_size(encoded):
+    """Size in bytes of the data an encoded image will store"""
+    kind, payload = encoded
+    if kind == "blank":
+        return encoded_size(payload)
+    if kind == "stream":
+        return len(payload)
+    return len(payload[4])
+
+
+def is_blank(tiles):
+    """True if every (clip, encoded) tile of a page was classified blank"""
+    return all(encoded[0] == "blank" for _, encoded in tiles)
+
+
+def insert_encoded_image(doc, page, target_rect, encoded):
+    """Insert an encoded image into target_rect of page; returns the image xref"""
+    kind, payload = encoded
+    if kind == "blank":
+        return insert_encoded_image(doc, page, target_rect, payload)
+    if kind == "stream":
+        return page.insert_image(target_rect, stream=payload)
+
+    width, height, colorspace, bits, data = payload
+    xref = doc.get_new_xref()
+    doc.update_object(
+        xref,
+        f"<</Type/XObject/Subtype/Image/Width {width}/Height {height}"
+        f"/ColorSpace/{colorspace}/BitsPerComponent {bits}>>"
+    )
+    doc.update_stream(xref, data, compress=False)
+    doc.xref_set_key(xref, "Filter", "/FlateDecode")
+    page.insert_image(target_rect, xref=xref)
+    return xref
@@ -0,0 +1,667 @@
+"""GUI-free PDF resizing engine.
+
+This module holds all of the processing logic used by PDF Resizer Pro so it
+can run on machines without a display server. It must never import
+customtkinter or tkinter.
+"""
+import fitz  # PyMuPDF
+import os
+import math
+import multiprocessing
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from pdf_encoding import (
+    DEFAULT_ENCODING, encode_pixmap, encoded_size, insert_encoded_image, is_blank, render_colorspace,
+    validate_encoding
+)
+from pdf_cache import make_key
+from pdf_dedup import PageDeduplicator
+from pdf_journal import JobJournal
+from pdf_progress import ProgressReporter, DEFAULT_RATE_HZ
+from pdf_source import (
+    as_source, is_path, open_document, picklable_source, source_digest, source_name, source_size
+)
+from pdf_stats import JobStats, add_timing
+from pdf_writer import DEFAULT_FLUSH_BYTES, DEFAULT_SAVE_PROFILE, PartWriter, save_options
+
+DPI_OPTIONS = [150, 200, 300, 400, 600]
+DEFAULT_SCALE_FACTOR = 0.9
+DEFAULT_DPI = 300
+DEFAULT_MAX_PAGES_PER_FILE = 10
+DEFAULT_WORKERS = 1
+
+# "raster" renders every page to an image; "vector" places the original
+# page content into the scaled area without rendering anything.
+RENDER_MODES = ["raster", "vector"]
+DEFAULT_RENDER_MODE = "raster"
+
+# Pages whose full pixmap would exceed this many bytes are rendered in strips
+DEFAULT_MAX_PIXMAP_BYTES = 256 * 1024 * 1024
+
+# Allowances used when estimating part sizes for max_bytes_per_file
+PAGE_OVERHEAD_BYTES = 512
+DOCUMENT_OVERHEAD_BYTES = 4096
+
+# Pages between emptying MuPDF's cache of decoded fonts and images
+STORE_TRIM_INTERVAL = 16
+
+RenderSettings = namedtuple("RenderSettings", ["scale_factor", "zoom", "encoding", "max_pixmap_bytes"])
+
+
+def make_output_filename(input_path, output_dir=None):
+    """Build a timestamped output filename for an input PDF"""
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{base_name}_resized_{timestamp}.pdf"
+    if output_dir is None:
+        return filename
+    return os.path.join(output_dir, filename)
+
+
+def chunk_filename(output_pdf_path, file_index):
+    """Return the filename used for split part number file_index (0-based)"""
+    base_name, ext = os.path.splitext(output_pdf_path)
+    return f"{base_name}_part{file_index + 1}{ext}"
+
+
+def scaled_target_rect(original_rect, scale_factor):
+    """Return the centered rectangle the scaled page content is placed into"""
+    scaled_width = original_rect.width * scale_factor
+    scaled_height = original_rect.height * scale_factor
+
+    x_offset = (original_rect.width - scaled_width) / 2
+    y_offset = (original_rect.height - scaled_height) / 2
+
+    return fitz.Rect(x_offset, y_offset, x_offset + scaled_width, y_offset + scaled_height)
+
+
+def page_matrix(scale_factor, zoom):
+    """Return the render matrix for the given scale factor and DPI zoom"""
+    return fitz.Matrix(zoom * scale_factor, zoom * scale_factor)
+
+
+def estimate_pixmap_bytes(rect, scale_factor, zoom, encoding):
+    """Estimate the size of the pixmap get_pixmap would allocate for rect"""
+    scale = zoom * scale_factor
+    return math.ceil(rect.width * scale) * math.ceil(rect.height * scale) * render_colorspace(encoding).n
+
+
+def tile_clips(rect, settings):
+    """Split rect into horizontal strips whose pixmaps fit in settings.max_pixmap_bytes.
+
+    Returns [None] when the whole page fits (or tiling is disabled). Strip
+    edges fall on whole pixel rows so neighbouring tiles neither overlap
+    nor leave gaps.
+    """
+    budget = settings.max_pixmap_bytes
+    if not budget or estimate_pixmap_bytes(rect, settings.scale_factor, settings.zoom, settings.encoding) <= budget:
+        return [None]
+
+    scale = settings.zoom * settings.scale_factor
+    row_bytes = math.ceil(rect.width * scale) * render_colorspace(settings.encoding).n
+    rows_per_tile = max(1, budget // row_bytes)
+    total_rows = math.ceil(rect.height * scale)
+
+    clips = []
+    for first_row in range(0, total_rows, rows_per_tile):
+        last_row = min(first_row + rows_per_tile, total_rows)
+        y0 = rect.y0 + first_row / scale
+        y1 = min(rect.y0 + last_row / scale, rect.y1)
+        clips.append(fitz.Rect(rect.x0, y0, rect.x1, y1))
+    return clips
+
+
+def render_page_tiles(page, settings, timings=None):
+    """Rasterize page in the encoding's colorspace, yielding (clip, encoded) tiles.
+
+    clip is None for a page rendered in one piece, otherwise the area of the
+    page the tile covers. Only one tile's pixmap is alive at a time. Time
+    spent rendering and encoding is added to the timings dict if given.
+    """
+    if timings is None:
+        timings = {}
+    matrix = page_matrix(settings.scale_factor, settings.zoom)
+    colorspace = render_colorspace(settings.encoding)
+    for clip in tile_clips(page.rect, settings):
+        start = time.perf_counter()
+        pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False, clip=clip)
+        rendered = time.perf_counter()
+        encoded = encode_pixmap(pix, settings.encoding)
+        pix = None
+        add_timing(timings, "render", rendered - start)
+        add_timing(timings, "encode", time.perf_counter() - rendered)
+        yield (None if clip is None else tuple(clip)), encoded
+
+
+def place_page_vector(input_doc, output_doc, page_num, scale_factor):
+    """Place one input page's content, scaled and centered, as vectors on a new output page"""
+    page = input_doc.load_page(page_num)
+    original_rect = page.rect
+    new_page = output_doc.new_page(width=original_rect.width, height=original_rect.height)
+    new_page.show_pdf_page(scaled_target_rect(original_rect, scale_factor), input_doc, page_num)
+
+
+def place_page_image(output_doc, original_rect, scale_factor, tiles, stats=None):
+    """Add a page the size of original_rect and insert the encoded tiles into its scaled area.
+
+    Returns [(tile_rect, xref), ...] so the images can be reused by place_page_xrefs.
+    """
+    new_page = output_doc.new_page(width=original_rect.width, height=original_rect.height)
+    target_rect = scaled_target_rect(original_rect, scale_factor)
+    images = []
+    for clip, encoded in tiles:
+        if clip is None:
+            tile_rect = target_rect
+        else:
+            # Map the clip from page space onto the matching slice of target_rect
+            clip = fitz.Rect(clip)
+            tile_rect = fitz.Rect(
+                target_rect.x0 + (clip.x0 - original_rect.x0) * scale_factor,
+                target_rect.y0 + (clip.y0 - original_rect.y0) * scale_factor,
+                target_rect.x0 + (clip.x1 - original_rect.x0) * scale_factor,
+                target_rect.y0 + (clip.y1 - original_rect.y0) * scale_factor,
+            )
+        start = time.perf_counter()
+        images.append((tile_rect, insert_encoded_image(output_doc, new_page, tile_rect, encoded)))
+        if stats is not None:
+            stats.add_time("insert_image", time.perf_counter() - start)
+            stats.add_bytes("image_bytes", encoded_size(encoded))
+    return images
+
+
+def place_page_xrefs(output_doc, original_rect, images):
+    """Add a page that shows images already stored in output_doc, without re-rendering"""
+    new_page = output_doc.new_page(width=original_rect.width, height=original_rect.height)
+    for tile_rect, xref in images:
+        new_page.insert_image(tile_rect, xref=xref)
+
+
+def trim_mupdf_store():
+    """Empty MuPDF's global store of decoded fonts and images.
+
+    The store is not size-limited here, so without this it keeps every
+    decoded input image until the process exits.
+    """
+    fitz.TOOLS.store_shrink(100)
+
+
+_worker_source = None
+
+
+def _set_worker_source(source):
+    """Worker process initializer: keep the input so batches need not carry it"""
+    global _worker_source
+    _worker_source = source
+
+
+def _render_page_batch(page_nums, settings):
+    """Worker process entry point: rasterize and encode page_nums.
+
+    Each worker opens its own document because fitz objects cannot be
+    shared across processes.
+    """
+    results = []
+    doc = open_document(_worker_source)
+    try:
+        for page_num in page_nums:
+            timings = {}
+            start = time.perf_counter()
+            page = doc.load_page(page_num)
+            rect = page.rect
+            add_timing(timings, "load_page", time.perf_counter() - start)
+            tiles = list(render_page_tiles(page, settings, timings))
+            results.append((page_num, (rect.x0, rect.y0, rect.x1, rect.y1), tiles, timings))
+    finally:
+        doc.close()
+        trim_mupdf_store()
+    return results
+
+
+def _batch_size(total_pages, workers):
+    """Pick a batch size that keeps every worker busy without huge result messages"""
+    return max(1, min(16, math.ceil(total_pages / (workers * 4))))
+
+
+def iter_rendered_pages_parallel(source, page_nums, settings, workers, should_continue):
+    """Render page_nums in a process pool, yielding (page_num, rect, tiles, timings) in page order.
+
+    At most two batches per worker are in flight at once so results waiting
+    for an earlier page cannot pile up in memory. Stops early, cancelling
+    outstanding work, once should_continue returns False. source is a path
+    or a buffer (see pdf_source); a buffer is sent to each worker once, when
+    it starts.
+    """
+    page_nums = list(page_nums)
+    size = _batch_size(len(page_nums), workers)
+    batches = [page_nums[i:i + size] for i in range(0, len(page_nums), size)]
+    max_in_flight = workers * 2
+
+    # spawn avoids forking a process that may be running a Tk event loop
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=_set_worker_source, initargs=(picklable_source(source),)
+    )
+    try:
+        pending = set()
+        ready = {}
+        next_batch = 0
+        position = 0
+
+        while position < len(page_nums):
+            while next_batch < len(batches) and len(pending) < max_in_flight:
+                pending.add(executor.submit(
+                    _render_page_batch, batches[next_batch], settings
+                ))
+                next_batch += 1
+
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                for page_num, rect, tiles, timings in future.result():
+                    ready[page_num] = (fitz.Rect(rect), tiles, timings)
+
+            while position < len(page_nums) and page_nums[position] in ready:
+                page_num = page_nums[position]
+                rect, tiles, timings = ready.pop(page_num)
+                position += 1
+                yield page_num, rect, tiles, timings
+
+            if not should_continue():
+                return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def font_file_xref(doc, font_xref):
+    """xref of a font's embedded font program, or 0 if it is not embedded"""
+    font_xrefs = [font_xref]
+    kind, value = doc.xref_get_key(font_xref, "DescendantFonts")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    if kind in ("array", "xref"):
+        # Type0 fonts keep the descriptor on their descendant font
+        font_xrefs += [int(ref) for ref in re.findall(r"(\d+) 0 R", value)]
+    for xref in font_xrefs:
+        for key in ("FontFile", "FontFile2", "FontFile3"):
+            kind, value = doc.xref_get_key(xref, "FontDescriptor/" + key)
+            if kind == "xref":
+                return int(value.split()[0])
+    return 0
+
+
+def vector_page_cost(doc, page, counted_xrefs):
+    """Estimate the bytes a vector-placed page adds to an output document.
+
+    Counts the content streams plus every embedded font program and image the
+    page uses that is not already in counted_xrefs (which is updated). Streams
+    are measured as stored, since the output keeps them compressed.
+    """
+    cost = PAGE_OVERHEAD_BYTES
+    for xref in page.get_contents():
+        cost += len(doc.xref_stream_raw(xref) or b"")
+    for font in page.get_fonts():
+        xref = font_file_xref(doc, font[0]) if font[0] else 0
+        if xref and xref not in counted_xrefs:
+            counted_xrefs.add(xref)
+            cost += len(doc.xref_stream_raw(xref) or b"")
+    for image in page.get_images():
+        xref = image[0]
+        if xref not in counted_xrefs:
+            counted_xrefs.add(xref)
+            cost += len(doc.xref_stream_raw(xref) or b"")
+    return cost
+
+
+def resize_pdf_for_printing(input_pdf_path, output_pdf_path, scale_factor, dpi, max_pages_per_file,
+                            should_continue=None, progress_callback=None, workers=DEFAULT_WORKERS,
+                            progress_rate_hz=DEFAULT_RATE_HZ, render_mode=DEFAULT_RENDER_MODE,
+                            encoding=DEFAULT_ENCODING, max_pixmap_bytes=DEFAULT_MAX_PIXMAP_BYTES,
+                            deduplicate=True, cache=None, stats=None, max_bytes_per_file=0,
+                            flush_bytes=DEFAULT_FLUSH_BYTES, resume=False, drop_blank_pages=False,
+                            save_profile=DEFAULT_SAVE_PROFILE, output_sink=None):
+    """Resize PDF pages with high resolution for quality printing.
+
+    should_continue is polled before every page; returning False cancels the
+    run. progress_callback receives a pdf_progress.ProgressUpdate at most
+    progress_rate_hz times per second, plus once on the last page.
+    With workers > 1 pages are rasterized in that many worker processes and
+    assembled here in page order. render_mode "vector" skips rasterization
+    entirely (dpi, workers and encoding are then ignored). encoding is a
+    pdf_encoding.ImageEncoding choosing format, quality and colorspace.
+    Pages whose pixmap would exceed max_pixmap_bytes are rendered in tiles
+    (0 disables tiling). With deduplicate, pages whose content is identical
+    to an earlier page are rendered and stored only once. cache is an
+    optional pdf_cache.ResultCache holding finished outputs and rendered
+    pages from earlier runs. Pass a pdf_stats.JobStats as stats to collect
+    per-stage timings and byte counts.
+    Output is split into _partN files every max_pages_per_file pages and/or
+    before a part would grow past max_bytes_per_file (0 disables either
+    limit). A single page larger than max_bytes_per_file gets a part of its
+    own. Each part is streamed to disk every flush_bytes of new content
+    (0 = only when the part is complete), so memory stays bounded however
+    many pages a part has. Input and output documents are closed, and the
+    unfinished part deleted, when the job is cancelled or fails.
+    Split jobs keep a pdf_journal.JobJournal next to the output while they
+    run. With resume, finished parts recorded there are verified and kept,
+    and the job continues after the last of them.
+    With drop_blank_pages (raster mode with colorspace "auto" only), pages
+    classified blank are left out of the output; the job fails if that
+    leaves no pages at all.
+    save_profile is one of pdf_writer.SAVE_PROFILES and trades save time
+    for output size; the "save" stage time and output_bytes in stats show
+    what it cost and saved.
+    input_pdf_path may also be bytes, a memoryview, an mmap or a binary
+    file object (see pdf_source). With output_sink, output_pdf_path is
+    ignored: output_sink(part_index) is called as each part starts and must
+    return a writable binary file object, which receives that part's PDF
+    once the part is complete; output_files then holds those objects.
+    Sinks and buffer inputs skip the journal (so resume has no effect),
+    and sinks skip the cache of finished outputs.
+    Returns (success, output_files).
+    """
+    if should_continue is None:
+        should_continue = lambda: True
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode}")
+    validate_encoding(encoding)
+    if drop_blank_pages and (render_mode != "raster" or encoding.colorspace != "auto"):
+        raise ValueError("Dropping blank pages needs raster mode with colorspace auto")
+    save_options(save_profile)  # raises ValueError for an unknown or unavailable profile
+    if stats is None:
+        stats = JobStats(keep_pages=False)
+
+    input_doc = None
+    rendered = None
+    writer = None
+    try:
+        with stats.stage("open"):
+            source = as_source(input_pdf_path)
+            input_doc = open_document(source)
+        total_pages = len(input_doc)
+        stats.info.update({
+            "input": source_name(source),
+            "page_count": total_pages,
+            "scale_factor": scale_factor,
+            "dpi": dpi,
+            "max_pages_per_file": max_pages_per_file,
+            "max_bytes_per_file": max_bytes_per_file,
+            "render_mode": render_mode,
+            "encoding": encoding._asdict(),
+            "workers": workers,
+            "drop_blank_pages": drop_blank_pages,
+            "save_profile": save_profile,
+        })
+        stats.add_bytes("input_bytes", source_size(source))
+        zoom = dpi / 72
+        settings = RenderSettings(scale_factor, zoom, encoding, max_pixmap_bytes)
+
+        output_files = []
+
+        def output_paths_for(part_count):
+            if part_count > 1:
+                return [chunk_filename(output_pdf_path, i) for i in range(part_count)]
+            return [output_pdf_path]
+
+        def make_progress(start_page):
+            progress = ProgressReporter(total_pages, rate_hz=progress_rate_hz, start=start_page)
+            if progress_callback is not None:
+                progress.subscribe(progress_callback)
+            return progress
+
+        journal = None
+        start_page = 0
+        use_journal = (max_pages_per_file > 0 or max_bytes_per_file > 0) and output_sink is None and is_path(source)
+        cache_outputs = cache is not None and output_sink is None
+        if cache is not None or use_journal:
+            with stats.stage("digest"):
+                input_digest = source_digest(source)
+            job_key = make_key(
+                "job", input_digest, scale_factor, dpi, max_pages_per_file, max_bytes_per_file,
+                render_mode, tuple(encoding), max_pixmap_bytes, deduplicate, drop_blank_pages, save_profile
+            )
+
+        if cache_outputs:
+            with stats.stage("cache"):
+                cached_outputs = cache.get_outputs(job_key, output_paths_for)
+                if cached_outputs is not None:
+                    # A hit still trims: earlier runs may have used a larger limit
+                    cache.evict()
+            if cached_outputs is not None:
+                stats.info["cache_hit"] = True
+                stats.add_bytes("output_bytes", sum(os.path.getsize(path) for path in cached_outputs))
+                make_progress(0).update(total_pages)
+                return True, cached_outputs
+
+        if use_journal:
+            journal = JobJournal(output_pdf_path, source, job_key, {
+                "scale_factor": scale_factor,
+                "dpi": dpi,
+                "max_pages_per_file": max_pages_per_file,
+                "max_bytes_per_file": max_bytes_per_file,
+                "render_mode": render_mode,
+                "encoding": encoding._asdict(),
+                "max_pixmap_bytes": max_pixmap_bytes,
+                "deduplicate": deduplicate,
+                "drop_blank_pages": drop_blank_pages,
+                "save_profile": save_profile,
+            })
+            if resume:
+                with stats.stage("journal"):
+                    start_page = journal.resume()
+                output_files = [part["path"] for part in journal.parts]
+                # Kept parts count towards the job's output like freshly written ones
+                stats.add_bytes("output_bytes", sum(part["bytes"] for part in journal.parts))
+                stats.info["resumed_from_page"] = start_page
+
+        progress = make_progress(start_page)
+
+        dedup = None
+        if render_mode == "raster" and deduplicate:
+            dedup = PageDeduplicator()
+            with stats.stage("fingerprint"):
+                dedup.scan(input_doc)
+            pages_to_render = dedup.first_occurrences(start_page)
+        else:
+            pages_to_render = list(range(start_page, total_pages))
+
+        def page_key(page_num):
+            return make_key("page", input_digest, page_num, scale_factor, dpi, tuple(encoding), max_pixmap_bytes)
+
+        if cache is not None and render_mode == "raster":
+            with stats.stage("cache"):
+                pages_to_render = [p for p in pages_to_render if not cache.has_page(page_key(p))]
+
+        # One pool serves every part so worker start-up is paid only once
+        if render_mode == "raster" and workers > 1 and len(pages_to_render) > 1:
+            rendered = iter_rendered_pages_parallel(
+                source, pages_to_render, settings, workers, should_continue
+            )
+            pool_pages = set(pages_to_render)
+        else:
+            pool_pages = set()
+
+        # Pages are prepared (rendered and encoded, so their size is known)
+        # before being placed, so a part can be closed before it overflows.
+        #   ("vector", rect, None, source)
+        #   ("reuse", rect, [(tile_rect, xref), ...], source)  current part only
+        #   ("tiles", rect, tiles, source)
+
+        def prepare_page(page_num):
+            """Obtain one page's content; returns None if the worker pool stopped early"""
+            if render_mode == "vector":
+                return "vector", None, None, "vector"
+
+            reused = dedup.placed_images(page_num) if dedup is not None else None
+            if reused is not None:
+                return "reuse", reused[0], reused[1], "reused"
+
+            cached = dedup.cached_tiles(page_num) if dedup is not None else None
+            source = "dedup_cache"
+            if cached is None and cache is not None and page_num not in pool_pages:
+                with stats.stage("cache"):
+                    cached = cache.get_page(page_key(page_num))
+                source = "disk_cache"
+            if cached is not None:
+                return "tiles", fitz.Rect(cached[0]), cached[1], source
+
+            timings = {}
+            if page_num in pool_pages:
+                with stats.stage("wait_workers"):
+                    rendered_num, original_rect, tiles, timings = next(rendered, (None, None, None, {}))
+                if rendered_num != page_num:
+                    return None
+                source = "worker"
+            else:
+                with stats.stage("load_page"):
+                    page = input_doc.load_page(page_num)
+                original_rect = page.rect
+                tiles = list(render_page_tiles(page, settings, timings))
+                source = "rendered"
+            stats.add_timings(timings)
+            if cache is not None:
+                with stats.stage("cache"):
+                    cache.put_page(page_key(page_num), original_rect, tiles)
+            return "tiles", original_rect, tiles, source
+
+        def prepared_blank(prepared):
+            kind, _, payload, _ = prepared
+            if kind == "tiles":
+                return is_blank(payload)
+            # A repeat of a dropped blank page was remembered with no images
+            return kind == "reuse" and not payload
+
+        counted_xrefs = set()
+
+        def prepared_cost(page_num, prepared):
+            kind, _, payload, _ = prepared
+            if kind == "tiles":
+                return sum(encoded_size(encoded) for _, encoded in payload) + PAGE_OVERHEAD_BYTES
+            if kind == "vector":
+                return vector_page_cost(input_doc, input_doc.load_page(page_num), counted_xrefs)
+            return PAGE_OVERHEAD_BYTES
+
+        def place_prepared(page_num, prepared, output_doc, part_end):
+            kind, original_rect, payload, _ = prepared
+            if kind == "vector":
+                with stats.stage("show_pdf_page"):
+                    place_page_vector(input_doc, output_doc, page_num, scale_factor)
+            elif kind == "reuse":
+                with stats.stage("insert_image"):
+                    place_page_xrefs(output_doc, original_rect, payload)
+            else:
+                images = place_page_image(output_doc, original_rect, scale_factor, payload, stats)
+                if dedup is not None:
+                    keep_tiles = dedup.repeats_from(page_num, part_end)
+                    dedup.remember(page_num, original_rect, images, payload if keep_tiles else None)
+
+        def save_part(writer, output_path=None, last_page=None):
+            output_files.append(writer.finish(output_path))
+            if journal is not None and last_page is not None:
+                with stats.stage("journal"):
+                    journal.add_part(output_files[-1], part_first_page, last_page)
+
+        part_pages = 0
+        part_bytes = 0
+        part_first_page = start_page
+        for page_num in range(start_page, total_pages):
+            if not should_continue():
+                return False, []
+
+            stats.begin_page(page_num)
+            prepared = prepare_page(page_num)
+            if prepared is None:
+                return False, []
+
+            if drop_blank_pages and prepared_blank(prepared):
+                if dedup is not None and prepared[0] == "tiles":
+                    dedup.remember(page_num, prepared[1], [],
+                                   prepared[2] if dedup.repeats_from(page_num, page_num + 1) else None)
+                stats.end_page("dropped_blank")
+                progress.update(page_num + 1)
+                continue
+
+            cost = prepared_cost(page_num, prepared)
+
+            full_by_pages = max_pages_per_file > 0 and part_pages >= max_pages_per_file
+            full_by_bytes = (
+                max_bytes_per_file > 0
+                and part_bytes + cost + DOCUMENT_OVERHEAD_BYTES > max_bytes_per_file
+            )
+            if writer is not None and part_pages and (full_by_pages or full_by_bytes):
+                save_part(writer, last_page=page_num - 1)
+                writer = None
+                # The next part starts right after this one, so blank pages dropped in between are covered
+                part_first_page = page_num
+                if dedup is not None:
+                    dedup.start_output()
+                if prepared[0] == "reuse":
+                    # Its images live in the part just saved; fetch them again
+                    prepared = prepare_page(page_num)
+                    if prepared is None:
+                        return False, []
+                    cost = prepared_cost(page_num, prepared)
+
+            if writer is None:
+                if output_sink is not None:
+                    writer = PartWriter(None, flush_bytes, stats, save_profile, sink=output_sink(len(output_files)))
+                else:
+                    writer = PartWriter(
+                        chunk_filename(output_pdf_path, len(output_files)), flush_bytes, stats, save_profile
+                    )
+                part_pages = 0
+                part_bytes = 0
+                counted_xrefs.clear()
+                if prepared[0] == "vector":
+                    cost = prepared_cost(page_num, prepared)
+
+            # Dropped pages shift later pages into earlier parts, so only predict part ends without them
+            if max_pages_per_file > 0 and not max_bytes_per_file and not drop_blank_pages:
+                part_end = (page_num // max_pages_per_file + 1) * max_pages_per_file
+            else:
+                part_end = page_num + 1
+            place_prepared(page_num, prepared, writer.doc, part_end)
+            part_pages += 1
+            part_bytes += cost
+            if writer.add_bytes(cost):
+                # Fonts and images copied for vector pages are copied again after a flush
+                counted_xrefs.clear()
+
+            stats.end_page(prepared[3])
+            progress.update(page_num + 1)
+            if (page_num + 1) % STORE_TRIM_INTERVAL == 0:
+                trim_mupdf_store()
+
+        if not should_continue():
+            return False, []
+
+        if writer is None and not output_files and drop_blank_pages:
+            raise RuntimeError("All pages were blank, so there is nothing to write")
+        if writer is not None:
+            save_part(writer, None if output_files else output_pdf_path)
+            writer = None
+        if journal is not None:
+            journal.remove()
+
+        if cache is not None:
+            with stats.stage("cache"):
+                if cache_outputs:
+                    cache.put_outputs(job_key, output_files)
+                cache.evict()
+        return True, output_files
+
+    except Exception as e:
+        print(f"Error in processing: {e}")
+        stats.info["error"] = str(e)
+        return False, []
+    finally:
+        if rendered is not None:
+            rendered.close()
+        if writer is not None:
+            writer.abort()
+        if input_doc is not None:
+            input_doc.close()
+        stats.finish()
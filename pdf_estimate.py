@@ -0,0 +1,295 @@
+"""Sample-based output size and run time estimation, and target-size tuning.
+
+A few pages spread evenly through the document are rendered and encoded,
+and the result is extrapolated to the whole document. Large pages are
+sampled as a few evenly spaced horizontal bands instead of the full
+bitmap, so a probe at 600 DPI costs about the same as one at 150 DPI.
+Sampled bitmaps are kept while a settings object is being tuned, so trying
+another quality only re-encodes them.
+"""
+from collections import namedtuple
+import math
+import time
+
+import fitz  # PyMuPDF
+
+from pdf_encoding import (
+    DEFAULT_ENCODING, class_from_counts, color_counts, encode_classified, encode_pixmap, encoded_size,
+    midtone_counts, render_colorspace, validate_encoding
+)
+from pdf_engine import (
+    DPI_OPTIONS, DEFAULT_MAX_PIXMAP_BYTES, DEFAULT_RENDER_MODE, DEFAULT_WORKERS, DOCUMENT_OVERHEAD_BYTES,
+    PAGE_OVERHEAD_BYTES, RENDER_MODES, RenderSettings, estimate_pixmap_bytes, page_matrix,
+    place_page_vector, vector_page_cost
+)
+from pdf_source import as_source, open_document
+from pdf_stats import add_timing
+
+DEFAULT_SAMPLE_SIZE = 4
+DEFAULT_MAX_SAMPLE_BYTES = 4 * 1024 * 1024
+SAMPLE_BANDS = 4
+MIN_TUNED_QUALITY = 30
+# Sampled estimates land within roughly +-15% of the real size
+TARGET_HEADROOM = 0.9
+QUALITY_STEPS = [95, 85, 75, 65, 50, 40, 30, 20, 10]
+
+TuneResult = namedtuple("TuneResult", ["dpi", "encoding", "estimated_bytes", "fits"])
+JobEstimate = namedtuple("JobEstimate", ["pages", "seconds", "output_bytes", "parts", "sampled_pages"])
+
+
+def sample_pages(total_pages, sample_size=DEFAULT_SAMPLE_SIZE):
+    """Pick up to sample_size page numbers spread evenly across the document"""
+    if total_pages <= sample_size:
+        return list(range(total_pages))
+    return sorted({int((i + 0.5) * total_pages / sample_size) for i in range(sample_size)})
+
+
+def sample_clips(rect, settings, max_sample_bytes=DEFAULT_MAX_SAMPLE_BYTES):
+    """Return the areas of rect to render when sampling it.
+
+    [None] (the whole page) if it fits in max_sample_bytes, otherwise
+    SAMPLE_BANDS evenly spaced full-width bands that together do.
+    """
+    full_bytes = estimate_pixmap_bytes(rect, settings.scale_factor, settings.zoom, settings.encoding)
+    if full_bytes <= max_sample_bytes:
+        return [None]
+    band_height = rect.height * max_sample_bytes / full_bytes / SAMPLE_BANDS
+    clips = []
+    for band in range(SAMPLE_BANDS):
+        center = rect.y0 + (band + 0.5) * rect.height / SAMPLE_BANDS
+        clips.append(fitz.Rect(rect.x0, center - band_height / 2, rect.x1, center + band_height / 2))
+    return clips
+
+
+def render_sample(page, settings, max_sample_bytes=DEFAULT_MAX_SAMPLE_BYTES, timings=None):
+    """Render the sampled areas of page.
+
+    Returns (pixmaps, scale_up) where scale_up converts sizes measured on
+    pixmaps into whole-page sizes.
+    """
+    if timings is None:
+        timings = {}
+    matrix = page_matrix(settings.scale_factor, settings.zoom)
+    colorspace = render_colorspace(settings.encoding)
+    pixmaps = []
+    start = time.perf_counter()
+    for clip in sample_clips(page.rect, settings, max_sample_bytes):
+        pixmaps.append(page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False, clip=clip))
+    add_timing(timings, "render", time.perf_counter() - start)
+
+    total_rows = math.ceil(page.rect.height * settings.zoom * settings.scale_factor)
+    sampled_rows = sum(pix.height for pix in pixmaps)
+    return pixmaps, max(1.0, total_rows / sampled_rows) if sampled_rows else 1.0
+
+
+def sample_encoded_bytes(pixmaps, scale_up, encoding, timings=None):
+    """Encode sampled pixmaps and return the projected encoded size of the page"""
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    if encoding.colorspace == "auto":
+        # Classify the bands together, as the engine classifies the whole page
+        grays = [pix if pix.n == 1 else fitz.Pixmap(fitz.csGRAY, pix) for pix in pixmaps]
+        counts = [color_counts(pix) + midtone_counts(gray) for pix, gray in zip(pixmaps, grays)]
+        page_class = class_from_counts(*(sum(column) for column in zip(*counts)))
+        size = sum(
+            encoded_size(encode_classified(pix, gray, page_class, encoding))
+            for pix, gray in zip(pixmaps, grays)
+        )
+    else:
+        size = sum(encoded_size(encode_pixmap(pix, encoding)) for pix in pixmaps)
+    add_timing(timings, "encode", time.perf_counter() - start)
+    return size * scale_up
+
+
+def extrapolate_bytes(mean_page_bytes, total_pages):
+    """Project a whole document's output size from the mean encoded page size"""
+    return int((mean_page_bytes + PAGE_OVERHEAD_BYTES) * total_pages + DOCUMENT_OVERHEAD_BYTES)
+
+
+class DocumentSample:
+    """Rendered samples of some pages of doc at one DPI, re-encodable at any quality"""
+
+    def __init__(self, doc, page_nums, settings, max_sample_bytes=DEFAULT_MAX_SAMPLE_BYTES):
+        self.total_pages = len(doc)
+        self.settings = settings
+        self.timings = {}
+        self.samples = [
+            render_sample(doc.load_page(page_num), settings, max_sample_bytes, self.timings)
+            for page_num in page_nums
+        ]
+        self.estimates = {}
+
+    def estimate(self, quality):
+        """Projected output size of the whole document at quality"""
+        if quality not in self.estimates:
+            encoding = self.settings.encoding._replace(quality=quality)
+            total = sum(
+                sample_encoded_bytes(pixmaps, scale_up, encoding, self.timings)
+                for pixmaps, scale_up in self.samples
+            )
+            self.estimates[quality] = extrapolate_bytes(total / len(self.samples), self.total_pages)
+        return self.estimates[quality]
+
+
+def estimate_part_count(total_pages, mean_page_bytes, max_pages_per_file, max_bytes_per_file):
+    """Number of output parts the engine's page and byte limits should produce"""
+    if not total_pages:
+        return 1
+    pages_per_part = max_pages_per_file or total_pages
+    if max_bytes_per_file:
+        fitting = int((max_bytes_per_file - DOCUMENT_OVERHEAD_BYTES) // max(1, mean_page_bytes + PAGE_OVERHEAD_BYTES))
+        pages_per_part = min(pages_per_part, max(1, fitting))
+    return math.ceil(total_pages / pages_per_part)
+
+
+def estimate_job(input_pdf_path, scale_factor, dpi, max_pages_per_file, render_mode=DEFAULT_RENDER_MODE,
+                 encoding=DEFAULT_ENCODING, max_bytes_per_file=0, workers=DEFAULT_WORKERS,
+                 sample_size=DEFAULT_SAMPLE_SIZE, max_pixmap_bytes=DEFAULT_MAX_PIXMAP_BYTES):
+    """Project run time, output size and part count for a resize job.
+
+    Takes the same settings as pdf_engine.resize_pdf_for_printing and
+    processes only a stratified sample of pages, so it returns in about a
+    second; in vector mode the output size is read off every page's stored
+    streams, which needs no rendering. Repeated pages are not detected, so
+    documents with many duplicates come in smaller and faster than estimated. seconds assumes
+    workers scale linearly. input_pdf_path may be a path or a buffer, as
+    for the engine.
+    """
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode}")
+    validate_encoding(encoding)
+    settings = RenderSettings(scale_factor, dpi / 72, encoding, max_pixmap_bytes)
+
+    doc = open_document(as_source(input_pdf_path))
+    try:
+        total_pages = len(doc)
+        pages = sample_pages(total_pages, sample_size)
+        if not pages:
+            return JobEstimate(0, 0.0, DOCUMENT_OVERHEAD_BYTES, 1, 0)
+
+        sampled_seconds = 0.0
+        if render_mode == "vector":
+            scratch = fitz.open()
+            try:
+                for page_num in pages:
+                    start = time.perf_counter()
+                    place_page_vector(doc, scratch, page_num, scale_factor)
+                    sampled_seconds += time.perf_counter() - start
+            finally:
+                scratch.close()
+            # Stream sizes are cheap to read, so every page is measured: a
+            # sample would count fonts shared by the whole document per page
+            counted_xrefs = set()
+            vector_bytes = sum(
+                vector_page_cost(doc, doc.load_page(page_num), counted_xrefs) for page_num in range(total_pages)
+            )
+            # vector_page_cost already includes the per-page overhead
+            mean_page_bytes = vector_bytes / total_pages - PAGE_OVERHEAD_BYTES
+        else:
+            sampled_bytes = 0
+            for page_num in pages:
+                timings = {}
+                pixmaps, scale_up = render_sample(doc.load_page(page_num), settings, timings=timings)
+                sampled_bytes += sample_encoded_bytes(pixmaps, scale_up, encoding, timings)
+                sampled_seconds += sum(timings.values()) * scale_up
+                pixmaps = None
+            mean_page_bytes = sampled_bytes / len(pages)
+
+        parallel = 1 if render_mode == "vector" else max(1, min(workers, total_pages))
+        return JobEstimate(
+            pages=total_pages,
+            seconds=sampled_seconds / len(pages) * total_pages / parallel,
+            output_bytes=extrapolate_bytes(mean_page_bytes, total_pages),
+            parts=estimate_part_count(total_pages, mean_page_bytes, max_pages_per_file, max_bytes_per_file),
+            sampled_pages=len(pages),
+        )
+    finally:
+        doc.close()
+
+
+def _best_quality(sample, qualities, target_bytes):
+    """Highest quality (interpolated between steps) whose estimate fits, or None.
+
+    qualities is in descending order and size is assumed to fall with it,
+    so the steps are binary-searched.
+    """
+    low, high = 0, len(qualities) - 1
+    if sample.estimate(qualities[high]) > target_bytes:
+        return None
+    while low < high:
+        middle = (low + high) // 2
+        if sample.estimate(qualities[middle]) <= target_bytes:
+            high = middle
+        else:
+            low = middle + 1
+    if low == 0:
+        return qualities[0]
+
+    fits_q, over_q = qualities[low], qualities[low - 1]
+    fits_size, over_size = sample.estimate(fits_q), sample.estimate(over_q)
+    if over_size <= fits_size:
+        return fits_q
+    return int(fits_q + (over_q - fits_q) * (target_bytes - fits_size) / (over_size - fits_size))
+
+
+def tune_for_target_size(input_pdf_path, target_bytes, scale_factor, encoding,
+                         dpi_options=DPI_OPTIONS, sample_size=DEFAULT_SAMPLE_SIZE,
+                         min_quality=MIN_TUNED_QUALITY, max_pixmap_bytes=DEFAULT_MAX_PIXMAP_BYTES,
+                         headroom=TARGET_HEADROOM):
+    """Choose the highest DPI (and for JPEG/JPX the highest quality) whose output should fit.
+
+    dpi_options and encoding.quality are upper bounds. DPIs are binary
+    searched on whether they fit at the lowest allowed quality, so only
+    about log2(len(dpi_options)) + 1 of them are sampled. Lossy formats never
+    go below min_quality. If nothing fits, returns the lowest DPI at the
+    lowest quality with fits=False. Settings are chosen to fit
+    target_bytes * headroom to leave room for estimation error.
+    input_pdf_path may be a path or a buffer, as for the engine.
+    """
+    validate_encoding(encoding)
+    target_bytes = int(target_bytes * headroom)
+    if encoding.image_format in ("jpeg", "jpx") and encoding.colorspace != "mono":
+        min_quality = min(min_quality, encoding.quality)
+        qualities = [encoding.quality] + [q for q in QUALITY_STEPS if min_quality <= q < encoding.quality]
+    else:
+        qualities = [encoding.quality]
+
+    dpis = sorted(dpi_options)
+    doc = open_document(as_source(input_pdf_path))
+    try:
+        pages = sample_pages(len(doc), sample_size)
+        if not pages:
+            return TuneResult(dpis[-1], encoding, DOCUMENT_OVERHEAD_BYTES, True)
+
+        samples = {}
+
+        def sample_at(index):
+            if index not in samples:
+                settings = RenderSettings(scale_factor, dpis[index] / 72, encoding, max_pixmap_bytes)
+                samples[index] = DocumentSample(doc, pages, settings)
+            return samples[index]
+
+        low, high = 0, len(dpis) - 1
+        best_index = None
+        while low <= high:
+            middle = (low + high) // 2
+            if sample_at(middle).estimate(qualities[-1]) <= target_bytes:
+                best_index = middle
+                low = middle + 1
+            else:
+                high = middle - 1
+            # Keep only the samples that can still be needed
+            for index in list(samples):
+                if index not in (best_index, 0):
+                    del samples[index]
+
+        if best_index is None:
+            estimated = sample_at(0).estimate(qualities[-1])
+            return TuneResult(dpis[0], encoding._replace(quality=qualities[-1]), estimated, False)
+
+        sample = sample_at(best_index)
+        quality = _best_quality(sample, qualities, target_bytes)
+        return TuneResult(dpis[best_index], encoding._replace(quality=quality), sample.estimate(quality), True)
+    finally:
+        doc.close()
@@ -0,0 +1,115 @@
+"""Job journal that lets an interrupted split job resume where it stopped.
+
+The engine writes "<output>.journal.json" next to the output as soon as the
+first part is finished, and rewrites it (atomically) after every later
+part. It records the input, the settings and, for every finished part,
+its page range, size and SHA-256. A resumed run keeps the leading parts
+that still match the journal and continues from the first page not
+covered by them. The journal is deleted once the job completes.
+"""
+import glob
+import json
+import os
+import tempfile
+
+from pdf_cache import file_digest
+
+JOURNAL_VERSION = 1
+
+
+def journal_path(output_pdf_path):
+    return os.path.splitext(output_pdf_path)[0] + ".journal.json"
+
+
+def load_journal(path):
+    """Return the parsed journal at path, or None if it is missing or unreadable"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != JOURNAL_VERSION:
+        return None
+    return data
+
+
+def find_resumable_jobs(input_pdf_path, output_dir):
+    """Return journals in output_dir left behind by unfinished jobs on input_pdf_path"""
+    input_path = os.path.abspath(input_pdf_path)
+    found = []
+    for path in sorted(glob.glob(os.path.join(glob.escape(output_dir), "*.journal.json"))):
+        data = load_journal(path)
+        if data is not None and data.get("input") == input_path:
+            found.append(data)
+    return found
+
+
+class JobJournal:
+    def __init__(self, output_pdf_path, input_pdf_path, job_key, settings):
+        self.path = journal_path(output_pdf_path)
+        self.output_pdf_path = output_pdf_path
+        self.input_pdf_path = os.path.abspath(input_pdf_path)
+        self.job_key = job_key
+        self.settings = settings
+        self.parts = []
+
+    def verified_parts(self):
+        """Return the leading parts of an existing journal whose files are intact.
+
+        Returns [] if there is no journal or it was written for different
+        input or settings.
+        """
+        data = load_journal(self.path)
+        if data is None or data.get("job_key") != self.job_key:
+            return []
+        parts = []
+        next_page = 0
+        for part in data.get("parts", []):
+            try:
+                intact = (
+                    part["first_page"] == next_page
+                    and os.path.getsize(part["path"]) == part["bytes"]
+                    and file_digest(part["path"]) == part["sha256"]
+                )
+            except (OSError, KeyError, TypeError):
+                intact = False
+            if not intact:
+                break
+            parts.append(part)
+            next_page = part["last_page"] + 1
+        return parts
+
+    def resume(self):
+        """Adopt the verified parts of an existing journal; returns the first page still to do"""
+        self.parts = self.verified_parts()
+        return self.parts[-1]["last_page"] + 1 if self.parts else 0
+
+    def add_part(self, path, first_page, last_page):
+        """Record a finished part and rewrite the journal"""
+        self.parts.append({
+            "path": path,
+            "first_page": first_page,
+            "last_page": last_page,
+            "bytes": os.path.getsize(path),
+            "sha256": file_digest(path),
+        })
+        self.write()
+
+    def write(self):
+        data = {
+            "version": JOURNAL_VERSION,
+            "input": self.input_pdf_path,
+            "output": self.output_pdf_path,
+            "job_key": self.job_key,
+            "settings": self.settings,
+            "parts": self.parts,
+        }
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,204 @@
+"""Low-resolution previews of how a page will look after processing.
+
+render_preview() runs one page through the engine's own placement and
+encoding code and returns two PNGs: the whole output page at thumbnail
+size, showing the scale factor and colors, and a 1:1 crop from the middle
+of the page at the job's DPI, showing resolution and compression.
+
+PreviewRenderer does the rendering on a background thread. Only the newest
+request is rendered, so dragging a slider queues at most one render, and
+finished previews are kept in a byte-bounded LRU keyed by file, page and
+every setting that changes the picture. It only ever opens the page asked
+for, so document length does not matter. PyMuPDF must not be used from
+several threads at once, so the GUI hands its other background MuPDF work
+(the estimate) to the same thread with PreviewRenderer.call().
+"""
+from collections import OrderedDict, namedtuple
+import threading
+
+import fitz  # PyMuPDF
+
+from pdf_encoding import encode_pixmap, insert_encoded_image, render_colorspace
+from pdf_engine import RenderSettings, page_matrix, place_page_image, place_page_vector, render_page_tiles
+
+DEFAULT_BOX = (220, 220)
+DEFAULT_MAX_CACHE_BYTES = 16 * 1024 * 1024
+
+PreviewRequest = namedtuple(
+    "PreviewRequest", ["path", "page_num", "scale_factor", "dpi", "render_mode", "encoding", "box"]
+)
+Preview = namedtuple("Preview", ["thumbnail", "detail", "page_count"])
+Preview.__doc__ = """PNG bytes of the whole page and of the 1:1 detail crop (None in vector mode)"""
+
+
+def make_request(path, page_num, scale_factor, dpi, render_mode, encoding, box=DEFAULT_BOX):
+    """Build a PreviewRequest, dropping settings that cannot change the picture.
+
+    Requests that differ only in ignored settings share a cache entry.
+    """
+    if render_mode == "vector":
+        dpi, encoding = None, None
+    elif encoding.image_format == "flate" or encoding.colorspace == "mono":
+        encoding = encoding._replace(quality=None)
+    return PreviewRequest(path, page_num, scale_factor, dpi, render_mode, encoding, tuple(box))
+
+
+def _render_output_page(output_doc, zoom):
+    pix = output_doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return pix.tobytes("png")
+
+
+def render_detail(page, scale_factor, dpi, encoding, box):
+    """Render and encode a box-sized area from the middle of page at dpi; returns PNG bytes"""
+    matrix = page_matrix(scale_factor, dpi / 72)
+    width, height = box[0] / matrix.a, box[1] / matrix.d
+    center = (page.rect.tl + page.rect.br) / 2
+    clip = fitz.Rect(center.x - width / 2, center.y - height / 2, center.x + width / 2, center.y + height / 2)
+    clip &= page.rect
+
+    pix = page.get_pixmap(matrix=matrix, colorspace=render_colorspace(encoding), alpha=False, clip=clip)
+    encoded = encode_pixmap(pix, encoding)
+    output_doc = fitz.open()
+    try:
+        output_page = output_doc.new_page(width=pix.width, height=pix.height)
+        insert_encoded_image(output_doc, output_page, output_page.rect, encoded)
+        return _render_output_page(output_doc, 1)
+    finally:
+        output_doc.close()
+
+
+def render_preview(doc, request):
+    """Render the Preview described by request from the open document doc"""
+    page = doc.load_page(request.page_num)
+    zoom = min(request.box[0] / page.rect.width, request.box[1] / page.rect.height)
+    output_doc = fitz.open()
+    try:
+        if request.render_mode == "vector":
+            place_page_vector(doc, output_doc, request.page_num, request.scale_factor)
+            detail = None
+        else:
+            # Never finer than the job itself; at thumbnail size that is always the case
+            settings = RenderSettings(request.scale_factor, min(zoom, request.dpi / 72), request.encoding, 0)
+            place_page_image(output_doc, page.rect, request.scale_factor, render_page_tiles(page, settings))
+            detail = render_detail(page, request.scale_factor, request.dpi, request.encoding, request.box)
+        return Preview(_render_output_page(output_doc, zoom), detail, len(doc))
+    finally:
+        output_doc.close()
+
+
+class PreviewCache:
+    """Byte-bounded LRU of finished previews; safe to use from several threads"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _size(preview):
+        return len(preview.thumbnail) + len(preview.detail or b"")
+
+    def get(self, request):
+        with self.lock:
+            preview = self.entries.get(request)
+            if preview is not None:
+                self.entries.move_to_end(request)
+            return preview
+
+    def put(self, request, preview):
+        with self.lock:
+            if request in self.entries:
+                return
+            self.entries[request] = preview
+            self.size += self._size(preview)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= self._size(evicted)
+
+
+class PreviewRenderer:
+    """Render previews on one background thread, newest request first.
+
+    on_ready(request, preview, error) is called from that thread; exactly
+    one of preview and error (a message) is set. Previews are handled
+    before calls, since they are quick and the user is waiting on them.
+    """
+
+    def __init__(self, on_ready, max_cache_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.on_ready = on_ready
+        self.cache = PreviewCache(max_cache_bytes)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.pending_call = None
+        self.closed = False
+        self.thread = None
+        self.doc = None
+        self.doc_path = None
+
+    def cached(self, request):
+        """Return the cached Preview for request, or None"""
+        return self.cache.get(request)
+
+    def request(self, request):
+        """Ask for a preview, replacing any request not yet started"""
+        with self.condition:
+            self.pending = request
+            self._wake()
+
+    def call(self, function):
+        """Run function() on the render thread, replacing any call not yet started"""
+        with self.condition:
+            self.pending_call = function
+            self._wake()
+
+    def _wake(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def _open(self, path):
+        if path != self.doc_path:
+            if self.doc is not None:
+                self.doc.close()
+            self.doc, self.doc_path = None, None
+            self.doc = fitz.open(path)
+            self.doc_path = path
+        return self.doc
+
+    def _run(self):
+        try:
+            while True:
+                with self.condition:
+                    while self.pending is None and self.pending_call is None and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    if self.pending is None:
+                        function, self.pending_call = self.pending_call, None
+                    else:
+                        function = None
+                        request, self.pending = self.pending, None
+
+                if function is not None:
+                    function()
+                    continue
+
+                preview = self.cache.get(request)
+                try:
+                    if preview is None:
+                        preview = render_preview(self._open(request.path), request)
+                        self.cache.put(request, preview)
+                except Exception as e:
+                    self.on_ready(request, None, str(e))
+                else:
+                    self.on_ready(request, preview, None)
+        finally:
+            if self.doc is not None:
+                self.doc.close()
@@ -0,0 +1,75 @@
+"""Throttled progress reporting for the resize engine.
+
+The engine calls ProgressReporter.update() after every page at full speed;
+subscribers only hear about it at a fixed rate (10 Hz by default), plus one
+final update when the run reaches its last page.
+"""
+import time
+from collections import namedtuple
+
+DEFAULT_RATE_HZ = 10
+
+ProgressUpdate = namedtuple(
+    "ProgressUpdate",
+    ["current", "total", "percentage", "elapsed", "pages_per_sec", "eta"]
+)
+ProgressUpdate.__doc__ = """Snapshot of a run. eta is in seconds, or None until it can be estimated"""
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds as H:MM:SS or M:SS"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+class ProgressReporter:
+    def __init__(self, total, rate_hz=DEFAULT_RATE_HZ, clock=time.monotonic, start=0):
+        self.total = total
+        self.start = start
+        self.interval = 1.0 / rate_hz if rate_hz > 0 else 0.0
+        self.clock = clock
+        self.subscribers = []
+        self.start_time = clock()
+        self.last_emit = None
+        self.current = start
+
+    def subscribe(self, callback):
+        """Register callback(ProgressUpdate); returns the callback for convenience"""
+        self.subscribers.append(callback)
+        return callback
+
+    def snapshot(self):
+        """Build a ProgressUpdate for the current state"""
+        elapsed = self.clock() - self.start_time
+        percentage = (self.current / self.total) * 100 if self.total else 100.0
+        # Pages already done when the reporter was created (a resumed job) don't count towards the rate
+        pages_per_sec = (self.current - self.start) / elapsed if elapsed > 0 else 0.0
+        if pages_per_sec > 0:
+            eta = (self.total - self.current) / pages_per_sec
+        else:
+            eta = None
+        return ProgressUpdate(self.current, self.total, percentage, elapsed, pages_per_sec, eta)
+
+    def update(self, current):
+        """Record that current pages are done; notify subscribers if the interval has passed"""
+        self.current = current
+        now = self.clock()
+        finished = current >= self.total
+        if not finished and self.last_emit is not None and now - self.last_emit < self.interval:
+            return
+        self.last_emit = now
+        self.emit()
+
+    def emit(self):
+        """Send the current snapshot to every subscriber immediately"""
+        if not self.subscribers:
+            return
+        update = self.snapshot()
+        for callback in list(self.subscribers):
+            callback(update)
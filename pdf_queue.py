@@ -0,0 +1,358 @@
+"""Multi-file job queue that runs resize jobs concurrently.
+
+Each job runs the engine in its own spawned process, so jobs really run
+in parallel (MuPDF holds the GIL) and a crashing job cannot take the
+queue down. A bounded number of worker threads each drive one job
+process at a time. Every job has its own CancelToken. Progress and the
+result come back over a pipe.
+
+    queue = JobQueue(concurrency=3)
+    for path in collect_input_files(["scans/"]):
+        queue.submit(path, make_output_filename(path), 0.9, 300, 10, workers=2)
+    queue.wait()
+
+on_update(job) is called from worker threads whenever a job changes.
+With max_pending, submit() raises QueueFull instead of accepting more than
+that many unfinished jobs, so callers can push back on their producers.
+"""
+from collections import namedtuple
+import glob
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+from pdf_engine import DPI_OPTIONS, resize_pdf_for_printing
+from pdf_encoding import DEFAULT_ENCODING
+from pdf_stats import JobStats
+
+DEFAULT_CONCURRENCY = 2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+Throughput = namedtuple("Throughput", ["jobs_finished", "jobs_total", "pages_done", "pages_total", "pages_per_sec"])
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already unfinished"""
+
+
+def collect_input_files(inputs, recursive=False):
+    """Expand files, glob patterns and directories into a sorted list of PDF paths"""
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.pdf") if recursive else os.path.join(item, "*.pdf")
+            found.extend(glob.glob(pattern, recursive=recursive))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            matches = glob.glob(item, recursive=recursive)
+            if not matches:
+                print(f"Warning: no files match {item}", file=sys.stderr)
+            found.extend(m for m in matches if os.path.isfile(m))
+
+    # Drop files reached through more than one input
+    seen = set()
+    files = []
+    for path in sorted(found):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+    return files
+
+
+class CancelToken:
+    """Per-job cancellation flag that also works inside the job's process"""
+
+    def __init__(self, context):
+        self.event = context.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def should_continue(self):
+        return not self.event.is_set()
+
+
+def _run_job(input_path, output_path, scale_factor, dpi, max_pages_per_file, options, target_bytes,
+             keep_pages, token, conn):
+    """Job process entry point: run one resize job and report back over conn"""
+    stats = JobStats(keep_pages=keep_pages)
+    try:
+        if target_bytes:
+            # Imported here so the queue module does not pull in the estimator for every job
+            from pdf_estimate import tune_for_target_size
+            tune_options = {}
+            if "max_pixmap_bytes" in options:
+                tune_options["max_pixmap_bytes"] = options["max_pixmap_bytes"]
+            tuned = tune_for_target_size(
+                input_path, target_bytes, scale_factor, options.get("encoding", DEFAULT_ENCODING),
+                dpi_options=[d for d in DPI_OPTIONS if d <= dpi], **tune_options
+            )
+            dpi = tuned.dpi
+            options = dict(options, encoding=tuned.encoding)
+            stats.info["tuned_dpi"] = tuned.dpi
+            stats.info["tuned_quality"] = tuned.encoding.quality
+            stats.info["tuned_fits"] = tuned.fits
+            stats.info["tuned_estimated_bytes"] = tuned.estimated_bytes
+
+        success, output_files = resize_pdf_for_printing(
+            input_path, output_path, scale_factor, dpi, max_pages_per_file,
+            should_continue=token.should_continue,
+            progress_callback=lambda update: conn.send(("progress", update)),
+            stats=stats,
+            **options
+        )
+        conn.send(("done", success, output_files, stats.report()))
+    except Exception as e:
+        conn.send(("error", str(e), stats.report()))
+    finally:
+        conn.close()
+
+
+class Job:
+    def __init__(self, job_id, input_path, output_path, scale_factor, dpi, max_pages_per_file,
+                 options, target_bytes, token):
+        self.id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.scale_factor = scale_factor
+        self.dpi = dpi
+        self.max_pages_per_file = max_pages_per_file
+        self.options = options
+        self.target_bytes = target_bytes
+        self.token = token
+        self.status = QUEUED
+        self.progress = None
+        self.output_files = []
+        self.error = None
+        self.report = None
+        self.started_at = None
+        self.finished_at = None
+        self.finished_event = threading.Event()
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def pages_done(self):
+        return self.progress.current if self.progress is not None else 0
+
+    @property
+    def total_pages(self):
+        return self.progress.total if self.progress is not None else None
+
+    @property
+    def pages_per_sec(self):
+        return self.progress.pages_per_sec if self.progress is not None else 0.0
+
+    def to_dict(self):
+        """JSON-serialisable view of the job"""
+        return {
+            "id": self.id,
+            "input": self.input_path,
+            "output": self.output_path,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "pages_per_sec": self.pages_per_sec,
+            "eta": self.progress.eta if self.progress is not None else None,
+            "output_files": self.output_files,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, on_update=None, keep_pages=False, max_pending=0):
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.on_update = on_update
+        self.keep_pages = keep_pages
+        self.context = multiprocessing.get_context("spawn")
+        self.pending = queue.Queue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.threads = []
+        self.started_at = None
+        self.closed = False
+
+    def submit(self, input_path, output_path, scale_factor, dpi, max_pages_per_file, target_bytes=0, **options):
+        """Queue a job; options are passed to pdf_engine.resize_pdf_for_printing.
+
+        Raises QueueFull if max_pending jobs are already queued or running.
+        """
+        if self.closed:
+            raise RuntimeError("Queue is shut down")
+        with self.lock:
+            if not self._has_room():
+                raise QueueFull(f"{self.max_pending} jobs are already waiting or running")
+            job = Job(
+                str(next(self.ids)), input_path, output_path, scale_factor, dpi, max_pages_per_file,
+                options, target_bytes, CancelToken(self.context)
+            )
+            self.jobs[job.id] = job
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            if len(self.threads) < self.concurrency:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                self.threads.append(thread)
+                thread.start()
+        self.pending.put(job)
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def all_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def forget(self, job_id):
+        """Drop a finished job from the queue's records; returns the job"""
+        with self.lock:
+            job = self.jobs[job_id]
+            if not job.finished:
+                raise ValueError(f"Job {job_id} has not finished")
+            return self.jobs.pop(job_id)
+
+    def has_room(self):
+        """Whether submit() would accept another job right now"""
+        with self.lock:
+            return self._has_room()
+
+    def _pending_count(self):
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def _has_room(self):
+        return not self.max_pending or self._pending_count() < self.max_pending
+
+    def cancel(self, job_id=None):
+        """Cancel one job, or every job if job_id is None"""
+        jobs = self.all_jobs() if job_id is None else [self.jobs[job_id]]
+        for job in jobs:
+            job.cancel()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+
+    def wait(self, timeout=None):
+        """Block until every submitted job has finished; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in self.all_jobs():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.finished_event.wait(remaining):
+                return False
+        return True
+
+    def shutdown(self, cancel=False, wait=True):
+        """Stop accepting jobs; optionally cancel outstanding ones and wait for the workers"""
+        self.closed = True
+        if cancel:
+            self.cancel()
+        for _ in self.threads:
+            self.pending.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def throughput(self):
+        """Aggregate progress and pages per second over the whole queue"""
+        jobs = self.all_jobs()
+        pages_done = sum(job.pages_done for job in jobs)
+        pages_total = sum(job.total_pages or 0 for job in jobs)
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        return Throughput(
+            jobs_finished=sum(1 for job in jobs if job.finished),
+            jobs_total=len(jobs),
+            pages_done=pages_done,
+            pages_total=pages_total,
+            pages_per_sec=pages_done / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def _notify(self, job):
+        if self.on_update is not None:
+            self.on_update(job)
+
+    def _finish(self, job, status, error=None):
+        if job.finished:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = time.monotonic()
+        job.finished_event.set()
+        self._notify(job)
+
+    def _worker(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            if job.finished:
+                continue
+            if job.token.cancelled:
+                self._finish(job, CANCELLED)
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        parent_conn, child_conn = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_run_job,
+            args=(job.input_path, job.output_path, job.scale_factor, job.dpi, job.max_pages_per_file,
+                  job.options, job.target_bytes, self.keep_pages, job.token, child_conn)
+        )
+        job.status = RUNNING
+        job.started_at = time.monotonic()
+        self._notify(job)
+        process.start()
+        child_conn.close()
+
+        result = None
+        try:
+            while True:
+                message = parent_conn.recv()
+                if message[0] == "progress":
+                    job.progress = message[1]
+                    self._notify(job)
+                else:
+                    result = message
+                    break
+        except EOFError:
+            pass
+        finally:
+            parent_conn.close()
+        process.join()
+
+        if result is None:
+            self._finish(job, FAILED, f"Job process exited with code {process.exitcode}")
+        elif result[0] == "error":
+            job.report = result[2]
+            self._finish(job, FAILED, result[1])
+        else:
+            _, success, output_files, job.report = result
+            job.output_files = output_files
+            if success:
+                self._finish(job, DONE)
+            elif job.token.cancelled:
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, FAILED, job.report.get("error", "Processing failed"))
@@ -0,0 +1,461 @@
+"""Service mode for PDF Resizer Pro: a watch folder and a localhost HTTP API.
+
+    python pdf_service.py --watch spool/ -o out/ -j 2 --max-queued 8 -d 200
+
+Both front ends feed one pdf_queue.JobQueue, so at most --jobs files are
+processed at a time and at most --max-queued are accepted but unfinished.
+When the queue is full the watcher leaves new files in the spool directory
+until there is room, and the HTTP API answers 503 with Retry-After.
+
+The watcher submits PDFs once their size and modification time have stayed
+the same for one poll, moving them to <spool>/processing while they run and
+to <spool>/done or <spool>/failed afterwards, after which the job is
+forgotten (the spool folders are its record). Outputs go to --output-dir.
+Files still in processing/ when the service stops are picked up again on
+restart, resuming from their journal if they were being split.
+
+HTTP API (options are the long CLI options as query parameters, e.g.
+?dpi=200&max_pages=0&no_dedup=1, and default to the service's own):
+
+    POST   /jobs?name=scan.pdf     body is the PDF; 202 with the job
+    GET    /jobs                   every job
+    GET    /jobs/<id>              one job, with its download links
+    GET    /jobs/<id>/files/<n>    output part n (1-based) of a finished job
+    DELETE /jobs/<id>              cancel a job, or forget a finished one
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pdf_cli
+import pdf_engine
+import pdf_journal
+import pdf_queue
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_PENDING = 16
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+RETRY_AFTER_SECONDS = 5
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Job options that take no value; as query parameters they are on when 1, true, yes or empty
+FLAG_OPTIONS = ("--no-dedup", "--drop-blank")
+
+
+class _OptionParser(argparse.ArgumentParser):
+    """Job option parser that raises ValueError instead of exiting"""
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+class ResizeService:
+    def __init__(self, output_dir, defaults, concurrency=pdf_queue.DEFAULT_CONCURRENCY,
+                 max_pending=DEFAULT_MAX_PENDING, quiet=False):
+        self.output_dir = output_dir
+        self.defaults = defaults
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.finish_callbacks = {}
+        self.option_parser = _OptionParser(add_help=False, allow_abbrev=False)
+        pdf_cli.add_job_arguments(self.option_parser)
+        self.option_parser.set_defaults(**vars(defaults))
+        self.queue = pdf_queue.JobQueue(concurrency, on_update=self.on_job_update, max_pending=max_pending)
+
+    def parse_options(self, query):
+        """Turn query parameters such as {"dpi": ["200"]} into job settings; raises ValueError"""
+        argv = []
+        for key, values in query.items():
+            option = "--" + key.replace("_", "-")
+            for value in values:
+                if option in FLAG_OPTIONS:
+                    if value.lower() in ("", "1", "true", "yes"):
+                        argv.append(option)
+                else:
+                    argv.extend([option, value])
+        args = self.option_parser.parse_args(argv)
+        pdf_cli.check_job_arguments(self.option_parser, args)
+        return args
+
+    def submit(self, input_path, output_path, args, on_finish=None, resume=False):
+        """Queue one file; on_finish(job) is called once it is done, failed or cancelled.
+
+        Raises pdf_queue.QueueFull when the service is at capacity.
+        """
+        with self.lock:
+            job = self.queue.submit(
+                input_path, output_path, args.scale / 100, args.dpi, args.max_pages,
+                target_bytes=int(args.target_mb * 1024 * 1024),
+                encoding=pdf_cli.job_encoding(args),
+                resume=resume,
+                **pdf_cli.job_engine_options(args)
+            )
+            if on_finish is not None:
+                self.finish_callbacks[job.id] = on_finish
+        self.log(f"Queued {job.id}: {input_path}")
+        return job
+
+    def on_job_update(self, job):
+        if not job.finished:
+            return
+        with self.lock:
+            on_finish = self.finish_callbacks.pop(job.id, None)
+        if job.status == pdf_queue.DONE:
+            self.log(f"Done {job.id}: {job.input_path} -> {', '.join(job.output_files)}")
+        elif job.status == pdf_queue.CANCELLED:
+            self.log(f"Cancelled {job.id}: {job.input_path}")
+        else:
+            self.log(f"Failed {job.id}: {job.input_path}: {job.error}")
+        if on_finish is not None:
+            try:
+                on_finish(job)
+            except OSError as e:
+                print(f"Warning: cleanup after job {job.id} failed: {e}", file=sys.stderr)
+
+    def log(self, message):
+        if not self.quiet:
+            print(message, flush=True)
+
+    def shutdown(self):
+        self.queue.shutdown(cancel=True)
+
+
+class FolderWatcher:
+    """Submit PDFs that appear in a spool directory to a ResizeService"""
+
+    def __init__(self, service, spool_dir, poll_interval=DEFAULT_POLL_SECONDS):
+        self.service = service
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.processing_dir = os.path.join(spool_dir, "processing")
+        self.done_dir = os.path.join(spool_dir, "done")
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.last_seen = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        for directory in (self.processing_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+        # Files left in processing/ by a previous run go back into the spool
+        for name in os.listdir(self.processing_dir):
+            os.replace(os.path.join(self.processing_dir, name), os.path.join(self.spool_dir, name))
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.scan()
+            except OSError as e:
+                print(f"Warning: scanning {self.spool_dir} failed: {e}", file=sys.stderr)
+            self.stop_event.wait(self.poll_interval)
+
+    def scan(self):
+        """Submit every PDF that has not changed since the last scan, while there is room"""
+        seen = {}
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if not name.lower().endswith(".pdf") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            seen[path] = (stat.st_size, stat.st_mtime_ns)
+        for path, signature in seen.items():
+            # New or still being written; look again on the next scan
+            if self.last_seen.get(path) != signature:
+                continue
+            if not self.service.queue.has_room():
+                break
+            self.claim(path)
+        self.last_seen = seen
+
+    def claim(self, path):
+        claimed_path = os.path.join(self.processing_dir, os.path.basename(path))
+        os.replace(path, claimed_path)
+        # A job interrupted by a restart left a journal for this same path; continue it
+        unfinished = pdf_journal.find_resumable_jobs(claimed_path, self.service.output_dir)
+        if unfinished:
+            output_path = unfinished[-1]["output"]
+        else:
+            output_path = pdf_engine.make_output_filename(path, self.service.output_dir)
+        try:
+            self.service.submit(claimed_path, output_path, self.service.defaults,
+                                on_finish=self.on_finish, resume=bool(unfinished))
+        except pdf_queue.QueueFull:
+            os.replace(claimed_path, path)
+
+    def on_finish(self, job):
+        # Jobs cancelled by a shutdown stay in processing/ and are picked up again on restart
+        if job.status == pdf_queue.CANCELLED and self.stop_event.is_set():
+            return
+        target_dir = self.done_dir if job.status == pdf_queue.DONE else self.failed_dir
+        try:
+            os.replace(job.input_path, os.path.join(target_dir, os.path.basename(job.input_path)))
+        finally:
+            # Nobody fetches watched jobs, so a long-running service would keep every one otherwise
+            self.service.queue.forget(job.id)
+
+
+def job_view(job):
+    """Job JSON including download links for its output parts"""
+    data = job.to_dict()
+    data["downloads"] = [f"/jobs/{job.id}/files/{n}" for n in range(1, len(job.output_files) + 1)]
+    return data
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PDFResizer"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.service.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {"error": message}, headers)
+
+    def route(self):
+        """Split the path into (parts, query), e.g. (["jobs", "3"], {})"""
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, parse_qs(url.query, keep_blank_values=True)
+
+    def find_job(self, job_id):
+        job = self.service.queue.get(job_id)
+        if job is None:
+            self.send_error_json(404, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        parts, _ = self.route()
+        if parts == ["jobs"]:
+            self.send_json(200, [job_view(job) for job in self.service.queue.all_jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.send_json(200, job_view(job))
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "files":
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.send_output_file(job, parts[3])
+        else:
+            self.send_error_json(404, "Not found")
+
+    def send_output_file(self, job, number):
+        if job.status != pdf_queue.DONE:
+            self.send_error_json(409, f"Job {job.id} is {job.status}")
+            return
+        if not number.isdigit() or not 1 <= int(number) <= len(job.output_files):
+            self.send_error_json(404, f"Job {job.id} has {len(job.output_files)} output files")
+            return
+        path = job.output_files[int(number) - 1]
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error_json(410, f"{os.path.basename(path)} is no longer available")
+            return
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        parts, query = self.route()
+        if parts != ["jobs"]:
+            self.send_error_json(404, "Not found")
+            return
+
+        busy_headers = {"Retry-After": str(RETRY_AFTER_SECONDS)}
+        # Refuse early so a full service does not read (or store) the upload at all
+        if not self.service.queue.has_room():
+            self.close_connection = True
+            self.send_error_json(503, "Too many jobs queued, retry later", busy_headers)
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self.send_error_json(411, "Content-Length is required")
+            return
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self.close_connection = True
+            self.send_error_json(413, f"Uploads are limited to {self.server.max_upload_bytes // (1024 * 1024)} MB")
+            return
+
+        name = os.path.basename(query.pop("name", ["upload.pdf"])[-1]) or "upload.pdf"
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        try:
+            args = self.service.parse_options(query)
+        except ValueError as e:
+            self.close_connection = True
+            self.send_error_json(400, str(e))
+            return
+
+        upload_dir = os.path.join(self.service.output_dir, "uploads", uuid.uuid4().hex)
+        os.makedirs(upload_dir)
+        input_path = os.path.join(upload_dir, name)
+        try:
+            self.receive_upload(input_path, length)
+            job = self.service.submit(
+                input_path, pdf_engine.make_output_filename(input_path, upload_dir), args,
+                on_finish=lambda job: os.remove(job.input_path)
+            )
+        except pdf_queue.QueueFull:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            self.send_error_json(503, "Too many jobs queued, retry later", busy_headers)
+            return
+        except (OSError, ValueError) as e:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            self.close_connection = True
+            self.send_error_json(400, str(e))
+            return
+        self.server.upload_dirs[job.id] = upload_dir
+        self.send_json(202, job_view(job), {"Location": f"/jobs/{job.id}"})
+
+    def receive_upload(self, path, length):
+        remaining = length
+        with open(path, "wb") as f:
+            while remaining:
+                chunk = self.rfile.read(min(UPLOAD_CHUNK_BYTES, remaining))
+                if not chunk:
+                    raise ValueError("Upload ended early")
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    def do_DELETE(self):
+        parts, _ = self.route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self.send_error_json(404, "Not found")
+            return
+        job = self.find_job(parts[1])
+        if job is None:
+            return
+        if not job.finished:
+            self.service.queue.cancel(job.id)
+            self.send_json(202, job_view(job))
+            return
+        self.service.queue.forget(job.id)
+        upload_dir = self.server.upload_dirs.pop(job.id, None)
+        if upload_dir is not None:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        self.send_json(200, job_view(job))
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+        self.max_upload_bytes = max_upload_bytes
+        self.upload_dirs = {}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="pdf_service",
+        description="Run PDF Resizer Pro as a service: watch a spool directory and/or "
+                    "accept jobs over a localhost HTTP API."
+    )
+    pdf_cli.add_job_arguments(parser)
+    parser.add_argument("--watch", metavar="DIR", help="spool directory to take new PDFs from")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="address the HTTP API listens on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="HTTP API port, 0 = no HTTP API (default: %(default)s)")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for output files")
+    parser.add_argument("-j", "--jobs", type=int, default=pdf_queue.DEFAULT_CONCURRENCY,
+                        help="files processed at the same time, each in its own process (default: %(default)s)")
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_PENDING,
+                        help="unfinished jobs accepted before new ones are refused, 0 = no limit (default: %(default)s)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="seconds between scans of the spool directory (default: %(default)s)")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help="largest PDF accepted over HTTP (default: %(default)s)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    pdf_cli.check_job_arguments(parser, args)
+    if args.jobs < 1:
+        parser.error("jobs must be at least 1")
+    if args.max_queued < 0:
+        parser.error("max queued jobs must be a positive number or 0")
+    if args.poll <= 0:
+        parser.error("poll interval must be positive")
+    if not args.watch and not args.port:
+        parser.error("nothing to do: give --watch and/or a --port")
+    if args.watch and not os.path.isdir(args.watch):
+        parser.error(f"{args.watch} is not a directory")
+
+    cpus = os.cpu_count() or 1
+    if args.jobs * args.workers > cpus:
+        print(f"Warning: {args.jobs} jobs x {args.workers} workers is more processes than the "
+              f"{cpus} CPUs available", file=sys.stderr)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    service = ResizeService(args.output_dir, args, args.jobs, args.max_queued, args.quiet)
+    watcher = None
+    server = None
+    # Stop cleanly under service managers, which send SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.watch:
+            watcher = FolderWatcher(service, args.watch, args.poll)
+            watcher.start()
+            service.log(f"Watching {args.watch}")
+        if args.port:
+            server = ServiceHTTPServer((args.host, args.port), service, args.max_upload_mb * 1024 * 1024)
+            service.log(f"Listening on http://{args.host}:{server.server_address[1]}")
+            server.serve_forever()
+        else:
+            watcher.thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.server_close()
+        if watcher is not None:
+            watcher.stop()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
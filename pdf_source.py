@@ -0,0 +1,74 @@
+"""Input documents given as a path, a buffer or a file object.
+
+The engine and estimator accept any of:
+
+    "scan.pdf" / pathlib.Path       read from disk as before
+    bytes, bytearray, memoryview    used in place (a memoryview is not copied)
+    mmap.mmap                       wrapped in a memoryview, so not copied either
+    binary file object              read() once into bytes, e.g. sys.stdin.buffer
+
+as_source() normalises these to either a path string or a bytes-like
+buffer; the other helpers take that normalised form.
+"""
+import hashlib
+import mmap
+import os
+
+import fitz  # PyMuPDF
+
+from pdf_cache import file_digest
+
+STREAM_NAME = "<stream>"
+
+
+def as_source(source):
+    """Return source as a path string or a bytes-like buffer"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, mmap.mmap):
+        return memoryview(source)
+    if hasattr(source, "read"):
+        return source.read()
+    raise TypeError(f"Cannot read a PDF from {type(source).__name__}")
+
+
+def is_path(source):
+    return isinstance(source, str)
+
+
+def open_document(source):
+    """Open a normalised source with PyMuPDF"""
+    if is_path(source):
+        return fitz.open(source)
+    if isinstance(source, bytearray):
+        # PyMuPDF would copy it anyway; a read-only view avoids that
+        source = memoryview(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def source_digest(source):
+    """SHA-256 hex digest of a normalised source's bytes"""
+    if is_path(source):
+        return file_digest(source)
+    return hashlib.sha256(source).hexdigest()
+
+
+def source_size(source):
+    """Size in bytes of a normalised source"""
+    if is_path(source):
+        return os.path.getsize(source)
+    return memoryview(source).nbytes
+
+
+def source_name(source):
+    """Printable name for a normalised source"""
+    return source if is_path(source) else STREAM_NAME
+
+
+def picklable_source(source):
+    """The source in a form that can be sent to worker processes"""
+    if is_path(source) or isinstance(source, bytes):
+        return source
+    return bytes(source)
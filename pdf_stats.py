@@ -0,0 +1,160 @@
+"""Per-stage timing, byte counters and optional profiling for resize jobs.
+
+The engine records the time spent in each stage (load_page, render,
+encode, insert_image, save, ...) per page and per document into a JobStats.
+report() turns that into a plain dict; json_line() gives one JSON log line
+per job. Stage times measured in worker processes are CPU time spent in
+parallel, so their sum can exceed the job's wall-clock time.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+import cProfile
+import json
+import time
+import tracemalloc
+
+PROFILE_MODES = ["cprofile", "tracemalloc"]
+
+
+def add_timing(timings, stage, seconds):
+    """Accumulate seconds for stage in a plain dict (usable in worker processes)"""
+    timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class JobStats:
+    def __init__(self, keep_pages=True):
+        self.keep_pages = keep_pages
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.byte_counts = defaultdict(int)
+        self.pages = []
+        self.info = {}
+        self.current_page = None
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one call of stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        self.stage_seconds[name] += seconds
+        self.stage_calls[name] += calls
+        if self.current_page is not None:
+            self.current_page[name] = self.current_page.get(name, 0.0) + seconds
+
+    def add_timings(self, timings):
+        """Merge a {stage: seconds} dict, e.g. one returned by a worker"""
+        for name, seconds in timings.items():
+            self.add_time(name, seconds)
+
+    def add_bytes(self, name, count):
+        self.byte_counts[name] += count
+        if self.current_page is not None:
+            self.current_page[name] = self.current_page.get(name, 0) + count
+
+    def begin_page(self, page_num):
+        self.current_page = {"page": page_num}
+
+    def end_page(self, source):
+        """Finish the current page; source says how it was produced (rendered, reused, ...)"""
+        if self.current_page is not None:
+            self.current_page["source"] = source
+            if self.keep_pages:
+                self.pages.append(self.current_page)
+            self.byte_counts["pages_" + source] += 1
+        self.current_page = None
+
+    def finish(self):
+        self.end_time = time.perf_counter()
+
+    def report(self):
+        """Return the collected measurements as a JSON-serialisable dict"""
+        end_time = self.end_time if self.end_time is not None else time.perf_counter()
+        report = dict(self.info)
+        report["total_seconds"] = end_time - self.start_time
+        report["stages"] = {
+            name: {"seconds": self.stage_seconds[name], "calls": self.stage_calls[name]}
+            for name in sorted(self.stage_seconds)
+        }
+        report["counters"] = dict(sorted(self.byte_counts.items()))
+        if self.keep_pages:
+            report["pages"] = self.pages
+        return report
+
+    def json_line(self, include_pages=False):
+        """One-line JSON summary of the job, suitable for appending to a log"""
+        return report_json_line(self.report(), include_pages)
+
+    def summary(self):
+        """Human-readable table of stage times"""
+        return format_summary(self.report())
+
+
+def report_json_line(report, include_pages=False):
+    """One-line JSON form of a JobStats.report() dict"""
+    report = dict(report)
+    if not include_pages:
+        report.pop("pages", None)
+    return json.dumps(report, separators=(",", ":"))
+
+
+def format_summary(report):
+    """Human-readable table of stage times from a JobStats.report() dict"""
+    total = report["total_seconds"] or 1.0
+    lines = [f"  {'stage':<14}{'seconds':>10}{'calls':>8}{'share':>8}"]
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(
+            f"  {name:<14}{stage['seconds']:>10.3f}{stage['calls']:>8}{stage['seconds'] / total:>8.0%}"
+        )
+    lines.append(f"  {'total':<14}{report['total_seconds']:>10.3f}")
+    if "save_profile" in report:
+        save_seconds = report["stages"].get("save", {}).get("seconds", 0.0)
+        output_mb = report["counters"].get("output_bytes", 0) / 1024 / 1024
+        lines.append(f"  save profile {report['save_profile']}: {output_mb:.2f} MB written, {save_seconds:.3f}s to save")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiling(mode, output_path=None, stats=None):
+    """Profile the enclosed block with cProfile or tracemalloc.
+
+    cProfile data is dumped to output_path (for pstats/snakeviz).
+    tracemalloc records the Python-heap peak and top allocation sites
+    into stats.info. MuPDF's own allocations are not seen by tracemalloc.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if output_path:
+                profiler.dump_stats(output_path)
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if stats is not None:
+            stats.info["tracemalloc_peak_bytes"] = peak
+            stats.info["tracemalloc_top"] = [
+                {"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
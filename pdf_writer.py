@@ -0,0 +1,173 @@
+"""Streaming writer for output parts.
+
+MuPDF keeps every object of a new document in memory until it is saved,
+so a long unsplit job used to hold the whole output in RAM. PartWriter
+flushes the pages added so far to disk once they pass flush_bytes: the
+first flush saves the file, later ones append an incremental update, and
+after each flush the document is reopened from disk so the flushed objects
+are released. Memory therefore stays around flush_bytes however long the
+document is.
+
+Parts are written to "<path>.partial" and renamed into place by finish(),
+so a cancelled or failed job never leaves a truncated PDF under the final
+name. abort() closes the document and removes the partial file.
+
+The save profile decides how finish() writes the part:
+
+    fast   deflate only; flushes are kept as incremental updates
+    small  rewrite the part once, dropping unused and duplicate objects
+           and packing the rest into compressed object streams
+    web    linearized ("fast web view"), with unused and duplicate objects
+           dropped; only offered where the installed MuPDF can still
+           linearize (it cannot since 1.26)
+
+small and web cost one extra full write of each part that was flushed.
+
+Given a sink (a writable binary file object) instead of a path, finish()
+writes the part into the sink. A part that was never flushed goes there
+straight from memory; one that was is spilled to a temporary file as
+usual and copied into the sink at the end.
+"""
+import os
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+
+DEFAULT_FLUSH_BYTES = 64 * 1024 * 1024
+
+
+def linearize_supported():
+    """Whether this MuPDF can still write linearized files (removed in 1.26)"""
+    doc = fitz.open()
+    try:
+        doc.new_page()
+        doc.tobytes(linear=True)
+        return True
+    except Exception:
+        return False
+    finally:
+        doc.close()
+
+
+# Without linearization "web" would write the same file as "fast", so it is left out
+SAVE_PROFILES = ("fast", "small", "web") if linearize_supported() else ("fast", "small")
+DEFAULT_SAVE_PROFILE = "fast"
+
+
+def save_options(profile):
+    """Keyword arguments for Document.save() that implement a save profile"""
+    if profile == "web" and profile not in SAVE_PROFILES:
+        raise ValueError(f"Save profile web needs linearization, which MuPDF {fitz.VersionFitz} no longer supports")
+    if profile == "fast":
+        return {"deflate": True}
+    if profile == "small":
+        return {"deflate": True, "garbage": 4, "use_objstms": 1}
+    if profile == "web":
+        # Linearized files cannot use object streams
+        return {"deflate": True, "garbage": 3, "linear": True}
+    raise ValueError(f"Unknown save profile: {profile}")
+
+
+class PartWriter:
+    def __init__(self, path, flush_bytes=DEFAULT_FLUSH_BYTES, stats=None, save_profile=DEFAULT_SAVE_PROFILE,
+                 sink=None):
+        self.path = path
+        self.sink = sink
+        if sink is not None:
+            fd, self.partial_path = tempfile.mkstemp(suffix=".pdf.partial")
+            os.close(fd)
+        else:
+            self.partial_path = path + ".partial"
+        self.flush_bytes = flush_bytes
+        self.stats = stats
+        self.save_profile = save_profile
+        self.save_options = save_options(save_profile)
+        self.compact_path = self.partial_path + ".compact"
+        self.doc = fitz.open()
+        self.pending_bytes = 0
+        self.on_disk = False
+        self.flushes = 0
+
+    def add_bytes(self, count):
+        """Account for count bytes of newly placed content; returns True if that caused a flush"""
+        self.pending_bytes += count
+        if self.flush_bytes and self.pending_bytes >= self.flush_bytes:
+            self.flush()
+            return True
+        return False
+
+    def _stage(self, name, write):
+        if self.stats is not None:
+            with self.stats.stage(name):
+                return write()
+        return write()
+
+    def _write(self):
+        if self.on_disk:
+            self.doc.save(self.partial_path, incremental=True, deflate=True,
+                          encryption=fitz.PDF_ENCRYPT_KEEP)
+        else:
+            self.doc.save(self.partial_path, deflate=True)
+            self.on_disk = True
+
+    def flush(self):
+        """Write pending pages to disk and reopen the document to release them"""
+        self._stage("flush", self._write)
+        self.doc.close()
+        self.doc = fitz.open(self.partial_path)
+        self.pending_bytes = 0
+        self.flushes += 1
+
+    def finish(self, path=None):
+        """Write the remaining pages, close the document and move it to path.
+
+        path overrides the path given at construction. With a sink the part
+        is written to the sink instead, which is returned.
+        """
+        if path is not None:
+            self.path = path
+        if self.sink is not None and not self.on_disk:
+            return self._finish_to_sink()
+        rewrite = self.save_profile != "fast" and self.on_disk
+        if self.save_profile == "fast":
+            if self.pending_bytes or not self.on_disk:
+                self._stage("save", self._write)
+        else:
+            # A flushed part is a chain of incremental updates, so it is rewritten as one file beside it
+            target = self.compact_path if rewrite else self.partial_path
+            self._stage("save", lambda: self.doc.save(target, **self.save_options))
+        self.doc.close()
+        self.doc = None
+        if rewrite:
+            os.replace(self.compact_path, self.partial_path)
+        output_bytes = os.path.getsize(self.partial_path)
+        if self.sink is not None:
+            with open(self.partial_path, "rb") as f:
+                self._stage("write_sink", lambda: shutil.copyfileobj(f, self.sink))
+            os.remove(self.partial_path)
+        else:
+            os.replace(self.partial_path, self.path)
+        if self.stats is not None:
+            self.stats.add_bytes("output_bytes", output_bytes)
+        return self.path if self.sink is None else self.sink
+
+    def _finish_to_sink(self):
+        # Document.save() would write to a file object's .name, so serialise and write the bytes
+        data = self._stage("save", lambda: self.doc.tobytes(**self.save_options))
+        self.doc.close()
+        self.doc = None
+        os.remove(self.partial_path)
+        self._stage("write_sink", lambda: self.sink.write(data))
+        if self.stats is not None:
+            self.stats.add_bytes("output_bytes", len(data))
+        return self.sink
+
+    def abort(self):
+        """Close the document and delete anything written so far"""
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        for path in (self.partial_path, self.compact_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import fitz  # PyMuPDF
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def text_lines(page, count, top=160, size=10):
+    for i in range(count):
+        page.insert_text((72, top + i * 14), f"Body text line number {i} with some words in it", fontsize=size)
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Build a PDF from page-drawing functions; returns its path"""
+    def build(*draw_pages, name="input.pdf"):
+        doc = fitz.open()
+        for draw in draw_pages:
+            draw(doc.new_page())
+        path = tmp_path / name
+        # clean joins the per-call content streams into one, as producers do
+        doc.save(path, garbage=3, deflate=True, clean=True)
+        doc.close()
+        return str(path)
+    return build
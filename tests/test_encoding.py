@@ -0,0 +1,59 @@
+import fitz  # PyMuPDF
+import pytest
+
+from conftest import text_lines
+from pdf_encoding import classify_pixmap
+
+pytest.importorskip("numpy")
+
+
+def render(draw, dpi=150):
+    doc = fitz.open()
+    page = doc.new_page()
+    draw(page)
+    return page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+
+
+def shaded_table(page):
+    for row in range(8):
+        top = 100 + row * 20
+        if row % 2 == 0:
+            page.draw_rect(fitz.Rect(72, top, 520, top + 20), color=None, fill=(0.92, 0.92, 0.92))
+        page.insert_text((80, top + 14), f"Item {row}      12.50      Description", fontsize=11)
+    text_lines(page, 30, top=300)
+
+
+@pytest.mark.parametrize("dpi", [150, 300])
+def test_pale_color_page_is_color(dpi):
+    def pale_fills(page):
+        page.draw_rect(fitz.Rect(0, 0, page.rect.width, page.rect.height * 0.67), color=None, fill=(0.85, 0.95, 1.0))
+
+    assert classify_pixmap(render(pale_fills, dpi))[0] == "color"
+
+
+@pytest.mark.parametrize("dpi", [150, 300])
+def test_light_gray_shading_is_gray(dpi):
+    assert classify_pixmap(render(shaded_table, dpi))[0] == "gray"
+
+
+def test_small_shaded_box_is_gray():
+    def boxed(page):
+        page.draw_rect(fitz.Rect(72, 100, 250, 140), color=None, fill=(0.9, 0.9, 0.9))
+        text_lines(page, 40)
+
+    assert classify_pixmap(render(boxed, 300))[0] == "gray"
+
+
+def test_pale_gray_fill_is_not_blank():
+    def pale_gray(page):
+        page.draw_rect(page.rect, color=None, fill=(0.95, 0.95, 0.95))
+
+    assert classify_pixmap(render(pale_gray))[0] != "blank"
+
+
+def test_plain_text_is_mono():
+    assert classify_pixmap(render(lambda page: text_lines(page, 40), 300))[0] == "mono"
+
+
+def test_empty_page_is_blank():
+    assert classify_pixmap(render(lambda page: None))[0] == "blank"
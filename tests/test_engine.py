@@ -0,0 +1,69 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from conftest import text_lines
+from pdf_cache import ResultCache
+from pdf_encoding import ImageEncoding
+from pdf_engine import font_file_xref, resize_pdf_for_printing, vector_page_cost
+from pdf_stats import JobStats
+
+
+def embedded_font_page(page):
+    page.insert_font(fontname="F0", fontbuffer=fitz.Font("tiro").buffer)
+    page.insert_text((72, 100), "Embedded font", fontname="F0", fontsize=14)
+    text_lines(page, 40)
+
+
+def test_vector_page_cost_counts_stored_bytes(make_pdf):
+    doc = fitz.open(make_pdf(embedded_font_page, embedded_font_page))
+    font_xref = font_file_xref(doc, doc[0].get_fonts()[0][0])
+    assert font_xref
+    stored = len(doc.xref_stream_raw(font_xref))
+    assert stored < len(doc.xref_stream(font_xref))
+
+    counted = set()
+    first = vector_page_cost(doc, doc[0], counted)
+    second = vector_page_cost(doc, doc[1], counted)
+    assert font_xref in counted
+    # The shared font program is counted once, at its compressed size
+    assert first - second == stored
+
+
+def test_cache_hit_evicts(make_pdf, tmp_path):
+    path = make_pdf(lambda page: text_lines(page, 40), lambda page: text_lines(page, 20))
+    cache_dir = str(tmp_path / "cache")
+    resize_pdf_for_printing(path, str(tmp_path / "first.pdf"), 0.9, 150, 0, cache=ResultCache(cache_dir))
+
+    small = ResultCache(cache_dir, max_bytes=1)
+    stats = JobStats()
+    ok, outputs = resize_pdf_for_printing(path, str(tmp_path / "second.pdf"), 0.9, 150, 0, cache=small, stats=stats)
+    assert ok and stats.info.get("cache_hit")
+    assert small.size() <= 1
+
+
+def test_all_blank_pages_fail(make_pdf, tmp_path):
+    pytest.importorskip("numpy")
+    path = make_pdf(lambda page: None, lambda page: None)
+    stats = JobStats()
+    ok, outputs = resize_pdf_for_printing(
+        path, str(tmp_path / "out.pdf"), 0.9, 150, 0, stats=stats,
+        encoding=ImageEncoding("flate", 85, "auto"), drop_blank_pages=True
+    )
+    assert not ok and outputs == []
+    assert "blank" in stats.info["error"]
+    assert not list(tmp_path.glob("out*.pdf"))
+
+
+def test_report_counts_input_and_output_bytes(make_pdf, tmp_path):
+    path = make_pdf(lambda page: text_lines(page, 40))
+    cache = ResultCache(str(tmp_path / "cache"))
+    for name in ("first.pdf", "cached.pdf"):
+        stats = JobStats()
+        ok, outputs = resize_pdf_for_printing(path, str(tmp_path / name), 0.9, 150, 0, cache=cache, stats=stats)
+        assert ok
+        counters = stats.report()["counters"]
+        assert counters["input_bytes"] == os.path.getsize(path)
+        assert counters["output_bytes"] == sum(os.path.getsize(output) for output in outputs)
+    assert stats.info["cache_hit"]
@@ -0,0 +1,23 @@
+import os
+
+import fitz  # PyMuPDF
+
+from conftest import text_lines
+from pdf_engine import resize_pdf_for_printing
+from pdf_estimate import estimate_job
+
+
+def font_page(page):
+    page.insert_font(fontname="F0", fontbuffer=fitz.Font("tiro").buffer)
+    page.insert_text((72, 100), "Chapter heading", fontname="F0", fontsize=18)
+    text_lines(page, 40)
+
+
+def test_vector_estimate_matches_output(make_pdf, tmp_path):
+    path = make_pdf(*[font_page] * 30)
+    estimate = estimate_job(path, 0.9, 300, 0, render_mode="vector", sample_size=5)
+
+    ok, outputs = resize_pdf_for_printing(path, str(tmp_path / "out.pdf"), 0.9, 300, 0, render_mode="vector")
+    assert ok
+    actual = sum(os.path.getsize(output) for output in outputs)
+    assert 0.8 * actual <= estimate.output_bytes <= 1.25 * actual